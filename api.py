@@ -0,0 +1,445 @@
+"""
+HTTP API перекладача LegalTransUA (працює поряд зі Streamlit-сторінкою app.py).
+
+Запуск (один процес, див. нижче):
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+Ендпоінти:
+    GET    /health                      стан черг рушіїв
+    POST   /extract                     абзаци завантаженого DOCX/PDF (multipart)
+    POST   /extract/url                 абзаци веб-сторінки
+    POST   /translate                   пакетний переклад (JSON або потоковий NDJSON)
+    POST   /jobs                        асинхронна задача перекладу документа
+    GET    /jobs/{job_id}               стан і прогрес задачі
+    GET    /jobs/{job_id}/result        результати задачі (NDJSON)
+    GET    /jobs/{job_id}/files/{fmt}   таблиця результатів: docx, md, xlsx, jsonl, tmx
+    DELETE /jobs/{job_id}               скасування задачі
+    POST   /tables/{fmt}                таблиця з уже готових перекладів
+
+Кеш моделей MarianMT, пул HTTP-з'єднань, глосарій, диспетчер рушіїв і менеджер
+артефактів створюються один раз на процес і спільні для всіх запитів.
+
+API розраховане на один процес uvicorn (без --workers): реєстр асинхронних
+задач зберігається в пам'яті процесу, а ліміти рушіїв і моделі MarianMT
+діють у межах процесу, тому кожен додатковий процес множив би ліміти й
+пам'ять, а запити /jobs/{job_id} потрапляли б до процесу, який задачі не знає.
+Для горизонтального масштабування запускайте кілька окремих екземплярів
+(кожен зі своїми лімітами) за балансувальником, що направляє всі запити однієї
+задачі на екземпляр, який її створив. Каталог артефактів temp/jobs можна
+ділити з app.py та іншими екземплярами: активні задачі позначаються файлом
+із блокуванням (artifacts.ACTIVE_MARKER) і не витісняються іншими процесами.
+"""
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from translate_script import extract_text, extract_text_from_url, get_engine_functions, preload_models, sanitize_filename, EXTRACTOR_VERSION
+from glossary import load_glossary
+from result_store import ResultStore, ENGINES
+from exporters import export_xlsx, export_jsonl, export_tmx
+from upload_store import store_upload, find_upload, cached_extract
+from artifacts import ArtifactManager
+from agreement import score_agreement, RISK_THRESHOLD
+from governor import get_governor
+from pipeline import iter_translation_job, run_translation_job
+from language import LANGUAGES, SOURCE_LANGUAGES, AUTO, DEFAULT_SOURCE, DEFAULT_TARGET, resolve_source
+from marian_cache import get_marian_cache
+from tables import build_markdown, export_markdown, export_docx
+from versions import version_path, load_version, save_version, prefill_from_version
+
+TEMP_DIR = "temp"
+
+# Синхронний /translate призначений для коротких фрагментів, великі документи
+# перекладаються через асинхронні задачі /jobs
+MAX_SYNC_PARAGRAPHS = int(os.getenv("API_MAX_SYNC_PARAGRAPHS", "200"))
+
+# Скільки асинхронних задач виконуються одночасно (решта чекають у черзі)
+JOB_WORKERS = int(os.getenv("API_JOB_WORKERS", "4"))
+
+GLOSSARY_PATH = os.getenv("GLOSSARY_PATH", "glossary.csv")
+glossary = load_glossary(GLOSSARY_PATH) if os.path.exists(GLOSSARY_PATH) else None
+
+artifacts = ArtifactManager(os.path.join(TEMP_DIR, "jobs"))
+governor = get_governor()
+
+# Формат -> (функція експорту, розширення файлу, MIME-тип)
+EXPORTERS = {
+    "docx": (export_docx, "docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "md": (export_markdown, "md", "text/markdown"),
+    "xlsx": (export_xlsx, "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "jsonl": (export_jsonl, "jsonl", "application/x-ndjson"),
+    "tmx": (export_tmx, "tmx", "application/x-tmx+xml"),
+}
+
+app = FastAPI(title="LegalTransUA API")
+
+# -------------------- Моделі запитів --------------------
+
+class UrlRequest(BaseModel):
+    url: str
+
+class TranslateRequest(BaseModel):
+    paragraphs: List[str]
+    engines: List[str] = list(ENGINES)
+    glossary: bool = True
+    stream: bool = False
+    # Мова оригіналу ("auto" - визначити за текстом) та мова перекладу
+    source: str = DEFAULT_SOURCE
+    target: str = DEFAULT_TARGET
+
+class JobRequest(BaseModel):
+    # Абзаци або хеш файлу, раніше завантаженого через /extract
+    paragraphs: Optional[List[str]] = None
+    digest: Optional[str] = None
+    # Ім'я документа: використовується в назвах файлів результатів, а для
+    # incremental - як ідентифікатор, за яким шукається попередня версія
+    name: Optional[str] = None
+    engines: List[str] = list(ENGINES)
+    glossary: bool = True
+    formats: List[str] = ["jsonl"]
+    source: str = DEFAULT_SOURCE
+    target: str = DEFAULT_TARGET
+    # Інкрементний переклад нової редакції документа name (обов'язкове):
+    # перекладаються лише нові та змінені абзаци, решта береться з
+    # попередньої версії
+    incremental: bool = False
+    mark_changes: bool = False
+
+class TableRequest(BaseModel):
+    paragraphs: List[str]
+    translations: Dict[str, List[str]]
+    source: str = DEFAULT_SOURCE
+    target: str = DEFAULT_TARGET
+
+# -------------------- Допоміжні функції --------------------
+
+def check_engines(names):
+    unknown = [name for name in names if name not in ENGINES]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"Невідомі рушії: {unknown}. Доступні: {list(ENGINES)}")
+
+def select_engines(names, use_glossary, source, target):
+    """Повертає функції обраних рушіїв для мовної пари у порядку запиту."""
+    check_engines(names)
+    functions = get_engine_functions(glossary if use_glossary else None, source, target)
+    return {name: functions[name] for name in dict.fromkeys(names)}
+
+def resolve_languages(source, target, paragraphs):
+    """Перевіряє мовну пару запиту; для source="auto" визначає мову за текстом."""
+    if source != AUTO and source not in SOURCE_LANGUAGES:
+        raise HTTPException(status_code=400, detail=f"Непідтримувана мова оригіналу: {source}. Доступні: {[AUTO, *SOURCE_LANGUAGES]}")
+    if target not in LANGUAGES:
+        raise HTTPException(status_code=400, detail=f"Непідтримувана мова перекладу: {target}. Доступні: {list(LANGUAGES)}")
+    source = resolve_source(source, paragraphs)
+    if source == target:
+        raise HTTPException(status_code=400, detail="Мова оригіналу збігається з мовою перекладу.")
+    return source, target
+
+def check_formats(formats):
+    unknown = [fmt for fmt in formats if fmt not in EXPORTERS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Невідомі формати: {unknown}. Доступні: {list(EXPORTERS)}")
+
+def add_agreement(store):
+    """Оцінює узгодженість рушіїв, якщо їх щонайменше два."""
+    if len(store.engines) < 2:
+        return False
+    store.set_agreement(score_agreement(store.source, {engine: store.column(engine) for engine in store.engines}))
+    return True
+
+def summarize(store):
+    summary = {
+        "paragraphs": len(store),
+        "errors": {engine: sum(store.errors[engine]) for engine in store.engines},
+    }
+    if store.risk is not None:
+        summary["risky_rows"] = int((store.risk >= RISK_THRESHOLD).sum())
+    return summary
+
+def to_ndjson(record):
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+def stream_translation(store, engines, job_id):
+    """Потокова відповідь: по одному рядку NDJSON на кожен отриманий переклад."""
+    try:
+        preload_models(engines, store.source_lang, store.target_lang)
+        for engine, idx in iter_translation_job(store, engines, governor, job_id):
+            yield to_ndjson({
+                "event": "result",
+                "id": idx + 1,
+                "engine": engine,
+                "text": store.translations[engine][idx],
+                "seconds": round(store.timings[engine][idx], 3),
+                "error": bool(store.errors[engine][idx]),
+            })
+        has_agreement = add_agreement(store)
+        summary = {"event": "done", "source": store.source_lang, "target": store.target_lang, **summarize(store)}
+        if has_agreement:
+            summary["agreement"] = [round(float(value), 3) for value in store.agreement]
+            summary["risk"] = [round(float(value), 3) for value in store.risk]
+        yield to_ndjson(summary)
+    finally:
+        # Якщо клієнт від'єднався, завдання запиту не повинні займати черги рушіїв
+        governor.cancel_job(job_id)
+
+# -------------------- Асинхронні задачі --------------------
+
+class JobRegistry:
+    """
+    Асинхронні задачі перекладу: стан зберігається в пам'яті процесу, а
+    результати - у каталогах артефактів (temp/jobs/<job_id>). Записи про
+    завершені задачі видаляються разом із закінченням TTL артефактів.
+    """
+
+    def __init__(self, max_workers):
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api-job")
+
+    def submit(self, paragraphs, engines, name, formats, source, target, version_file=None, mark_changes=False):
+        job_id, job_dir = artifacts.start_job()
+        job = {
+            "id": job_id,
+            "dir": job_dir,
+            "name": name,
+            "status": "queued",
+            "engines": list(engines),
+            "source": source,
+            "target": target,
+            "paragraphs": len(paragraphs),
+            "formats": formats,
+            "version_file": version_file,
+            "mark_changes": mark_changes,
+            "versions": None,
+            "files": {},
+            "progress": dict.fromkeys(engines, 0.0),
+            "summary": None,
+            "error": None,
+            "created": time.time(),
+            "finished": None,
+            "store": None,
+        }
+        with self.lock:
+            self._prune()
+            self.jobs[job_id] = job
+        self.executor.submit(self._run, job, paragraphs, engines)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Задачу не знайдено.")
+        return job
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job["status"] in ("queued", "running"):
+            job["status"] = "cancelled"
+            governor.cancel_job(job_id)
+        return job
+
+    def status(self, job):
+        store = job["store"]
+        if store is not None:
+            job["progress"] = {engine: store.progress(engine) for engine in store.engines}
+        public = {key: value for key, value in job.items() if key not in ("dir", "store", "files", "version_file")}
+        public["files"] = sorted(job["files"])
+        return public
+
+    def _run(self, job, paragraphs, engines):
+        if job["status"] == "cancelled":
+            artifacts.fail_job(job["id"])
+            job["finished"] = time.time()
+            return
+        job["status"] = "running"
+        store = job["store"] = ResultStore(paragraphs, engines=list(engines), source_lang=job["source"], target_lang=job["target"])
+        succeeded = False
+        try:
+            previous_rows = load_version(job["version_file"]) if job["version_file"] else None
+            if previous_rows:
+                job["versions"] = prefill_from_version(store, previous_rows, job["mark_changes"])
+            preload_models(engines, job["source"], job["target"])
+            for _ in iter_translation_job(store, engines, governor, job["id"]):
+                if job["status"] == "cancelled":
+                    raise CancelledError()
+            add_agreement(store)
+            for fmt in dict.fromkeys(["jsonl", *job["formats"]]):
+                exporter, ext, _ = EXPORTERS[fmt]
+                path = exporter(store, os.path.join(job["dir"], f"{job['name']}_Translated.{ext}"))
+                if not path:
+                    raise RuntimeError(f"Не вдалося створити файл формату {fmt}.")
+                job["files"][fmt] = path
+            if job["version_file"] and not store.all_empty():
+                save_version(store, job["version_file"])
+            job["summary"] = summarize(store)
+            job["status"] = "done"
+            succeeded = True
+        except CancelledError:
+            job["status"] = "cancelled"
+        except Exception as e:
+            logging.error(f"Помилка задачі {job['id']}: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            governor.cancel_job(job["id"])
+            job["progress"] = {engine: store.progress(engine) for engine in store.engines}
+            # Результати доступні з файлів артефактів, тому сховище звільняється
+            job["store"] = None
+            job["finished"] = time.time()
+            if succeeded:
+                artifacts.finish_job(job["id"])
+            else:
+                artifacts.fail_job(job["id"])
+                job["files"] = {}
+
+    def _prune(self):
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job["finished"] and now - job["finished"] > artifacts.ttl_seconds:
+                del self.jobs[job_id]
+
+jobs = JobRegistry(JOB_WORKERS)
+
+def job_file(job, fmt):
+    path = job["files"].get(fmt)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Файл формату {fmt} для задачі відсутній (статус: {job['status']}).")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Артефакти задачі вже видалено.")
+    artifacts.touch(job["id"])
+    return path
+
+# -------------------- Ендпоінти --------------------
+
+@app.get("/health")
+def health():
+    return {
+        "status": "ok",
+        "glossary": glossary is not None,
+        "engines": governor.snapshot(),
+        "marian_models": get_marian_cache().snapshot(),
+    }
+
+@app.post("/extract")
+def extract(file: UploadFile = File(...)):
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    if ext not in (".docx", ".pdf"):
+        raise HTTPException(status_code=400, detail="Підтримуються лише файли у форматах DOCX або PDF.")
+    file_path, digest = store_upload(file.file, name=file.filename)
+    paragraphs = cached_extract(file_path, digest, extract_text, EXTRACTOR_VERSION)
+    if not paragraphs:
+        raise HTTPException(status_code=422, detail="Не вдалося витягти текст із файлу.")
+    return {"digest": digest, "name": file.filename, "paragraphs": paragraphs}
+
+@app.post("/extract/url")
+def extract_url(request: UrlRequest):
+    try:
+        paragraphs = extract_text_from_url(request.url)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return {"url": request.url, "paragraphs": paragraphs}
+
+@app.post("/translate")
+def translate(request: TranslateRequest):
+    if len(request.paragraphs) > MAX_SYNC_PARAGRAPHS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Забагато абзаців для синхронного перекладу (максимум {MAX_SYNC_PARAGRAPHS}). Використайте /jobs.",
+        )
+    source, target = resolve_languages(request.source, request.target, request.paragraphs)
+    engines = select_engines(request.engines, request.glossary, source, target)
+    job_id = f"api-{uuid.uuid4().hex}"
+    if request.stream:
+        store = ResultStore(request.paragraphs, engines=list(engines), source_lang=source, target_lang=target)
+        return StreamingResponse(stream_translation(store, engines, job_id), media_type="application/x-ndjson")
+
+    try:
+        preload_models(engines, source, target)
+        store = run_translation_job(request.paragraphs, engines, governor, job_id, source_lang=source, target_lang=target)
+    finally:
+        governor.cancel_job(job_id)
+    add_agreement(store)
+    return {"source": source, "target": target, "rows": list(store.iter_rows()), **summarize(store)}
+
+@app.post("/jobs", status_code=202)
+def create_job(request: JobRequest):
+    check_engines(request.engines)
+    check_formats(request.formats)
+    name = (request.name or "").strip()
+    # Без явного імені всі документи потрапили б в одну версію "document"
+    if request.incremental and not name:
+        raise HTTPException(status_code=400, detail="Для incremental вкажіть name - ідентифікатор документа, за яким шукається попередня версія.")
+    paragraphs = request.paragraphs
+    if paragraphs is None:
+        file_path = find_upload(request.digest) if request.digest else None
+        if file_path is None:
+            raise HTTPException(status_code=400, detail="Передайте paragraphs або digest файлу, завантаженого через /extract.")
+        paragraphs = cached_extract(file_path, request.digest, extract_text, EXTRACTOR_VERSION)
+    if not paragraphs:
+        raise HTTPException(status_code=422, detail="Документ не містить тексту для перекладу.")
+    source, target = resolve_languages(request.source, request.target, paragraphs)
+    engines = select_engines(request.engines, request.glossary, source, target)
+    version_file = version_path(name, source, target, glossary if request.glossary else None) if request.incremental else None
+    job = jobs.submit(
+        paragraphs, engines, sanitize_filename(name or "document"), request.formats, source, target,
+        version_file=version_file, mark_changes=request.mark_changes,
+    )
+    return jobs.status(job)
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return jobs.status(jobs.get(job_id))
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = jobs.get(job_id)
+    return FileResponse(job_file(job, "jsonl"), media_type="application/x-ndjson")
+
+@app.get("/jobs/{job_id}/files/{fmt}")
+def get_job_file(job_id: str, fmt: str):
+    check_formats([fmt])
+    path = job_file(jobs.get(job_id), fmt)
+    return FileResponse(path, media_type=EXPORTERS[fmt][2], filename=os.path.basename(path))
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    return jobs.status(jobs.cancel(job_id))
+
+@app.post("/tables/{fmt}")
+def build_table(fmt: str, request: TableRequest):
+    check_formats([fmt])
+    check_engines(list(request.translations))
+    if any(len(column) != len(request.paragraphs) for column in request.translations.values()):
+        raise HTTPException(status_code=400, detail="Кількість перекладів має збігатися з кількістю абзаців.")
+
+    store = ResultStore(request.paragraphs, engines=list(request.translations), source_lang=request.source, target_lang=request.target)
+    for engine, column in request.translations.items():
+        for idx, text in enumerate(column):
+            store.set_result(engine, idx, text)
+    add_agreement(store)
+    if fmt == "md":
+        return PlainTextResponse(build_markdown(store), media_type="text/markdown")
+
+    exporter, ext, mime = EXPORTERS[fmt]
+    job_id, job_dir = artifacts.start_job()
+    path = exporter(store, os.path.join(job_dir, f"translation_table.{ext}"))
+    if not path:
+        artifacts.fail_job(job_id)
+        raise HTTPException(status_code=500, detail="Не вдалося створити таблицю.")
+    artifacts.finish_job(job_id)
+    return FileResponse(path, media_type=mime, filename=os.path.basename(path))
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("API_HOST", "0.0.0.0"), port=int(os.getenv("API_PORT", "8000")))
@@ -1,14 +1,26 @@
 import tracemalloc
 import streamlit as st
 import os
+import time
 from translate_script import (
     extract_text, translate_text_google, translate_text_marian, translate_text_openai,
     create_translation_table_markdown, extract_text_from_url, 
     create_table_with_styles, extract_text_from_docx, extract_text_from_pdf, 
-    generate_docx, apply_styles_to_docx, apply_styles_directly
+    generate_docx, apply_styles_to_docx, apply_styles_directly, get_engine_functions, preload_models, EXTRACTOR_VERSION
 )
-from transformers import MarianMTModel, MarianTokenizer
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from glossary import load_glossary
+from result_store import ResultStore, ENGINE_LABELS, is_error
+from exporters import export_xlsx, export_jsonl, export_tmx
+from upload_store import store_upload, cached_extract
+from artifacts import ArtifactManager
+from agreement import score_agreement, RISK_THRESHOLD, METRIC_NAME
+from tables import build_markdown, build_change_marks, export_docx
+from versions import version_path, load_version, save_version, prefill_from_version
+from docx_stream import translate_docx_in_place, iter_docx_paragraphs
+from language import LANGUAGE_LABELS, SOURCE_LANGUAGES, AUTO, DEFAULT_TARGET, resolve_source
+from marian_cache import get_marian_cache
+from governor import get_governor
+from pipeline import run_translation_job
 import logging
 from dotenv import load_dotenv
 
@@ -26,10 +38,26 @@ if not openai_api_key:
     st.error("Не знайдено OpenAI API ключ. Перевірте файл .env.")
     st.stop()
 
-# Ініціалізація MarianMT
-model_name = "Helsinki-NLP/opus-mt-en-uk"
-tokenizer = MarianTokenizer.from_pretrained(model_name)
-model = MarianMTModel.from_pretrained(model_name)
+# Менеджер артефактів спільний для всіх сесій процесу
+@st.cache_resource
+def get_artifact_manager():
+    return ArtifactManager(os.path.join(TEMP_DIR, "jobs"))
+
+artifacts = get_artifact_manager()
+
+# Диспетчер рушіїв спільний для всіх сесій процесу
+governor = get_governor()
+
+# Глосарій обов'язкових перекладів юридичних термінів (необов'язковий)
+GLOSSARY_PATH = os.getenv("GLOSSARY_PATH", "glossary.csv")
+
+@st.cache_resource
+def get_glossary(file_path):
+    if not os.path.exists(file_path):
+        return None
+    return load_glossary(file_path)
+
+glossary = get_glossary(GLOSSARY_PATH)
 
 # Налаштування Streamlit
 st.set_page_config(page_title="LegalTransUA", layout="wide")
@@ -48,86 +76,218 @@ section = st.sidebar.radio(
     ["Головна сторінка", "Про додаток", "Контакти", "Допомога ЗСУ", "Корисні посилання"]
 )
 
-# Функція для збереження завантаженого файлу
+# Метрики черг рушіїв перекладу
+with st.sidebar.expander("Навантаження рушіїв"):
+    st.dataframe({
+        ENGINE_LABELS.get(engine, engine): {
+            "Ліміт": metrics["limit"],
+            "Виконується": metrics["active"],
+            "У черзі": metrics["queued"],
+            "Задач у черзі": metrics["jobs"],
+            "Сер. очікування, с": round(metrics["avg_wait"], 2),
+        }
+        for engine, metrics in governor.snapshot().items()
+    })
+
+# Моделі MarianMT, завантажені для різних мовних пар
+with st.sidebar.expander("Моделі MarianMT"):
+    marian_state = get_marian_cache().snapshot()
+    st.write(", ".join(marian_state["pairs"]) or "Моделі не завантажено.")
+    st.write(f"Пам'ять: {marian_state['bytes'] / 1024 / 1024:.0f} з {marian_state['budget_bytes'] / 1024 / 1024:.0f} МБ")
+
+# Функція для збереження завантаженого файлу у сховище з адресацією за вмістом
 def save_uploaded_file(uploaded_file):
-    file_path = os.path.join(TEMP_DIR, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    return file_path
+    return store_upload(uploaded_file, os.path.join(TEMP_DIR, "uploads"))
 
-# Функція обробки перекладу
-def process_translation(paragraphs, base_name):
-    google_translations = [""] * len(paragraphs)
-    marian_translations = [""] * len(paragraphs)
-    openai_translations = [""] * len(paragraphs)
+# Інтервал (с) між оновленнями таблиці результатів у браузері
+RENDER_INTERVAL = 1.0
 
-    # Прогрес бари
-    st.write("Прогрес перекладу Google Translate:")
-    google_progress = st.progress(0)
-    st.write("Прогрес перекладу MarianMT:")
-    marian_progress = st.progress(0)
-    st.write("Прогрес перекладу OpenAI GPT:")
-    openai_progress = st.progress(0)
-
-    # Виконання перекладів у потоках
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        google_futures = {executor.submit(translate_text_google, para): idx for idx, para in enumerate(paragraphs)}
-        for i, future in enumerate(as_completed(google_futures)):
-            idx = google_futures[future]
-            google_translations[idx] = future.result() or "Помилка перекладу"
-            google_progress.progress((i + 1) / len(paragraphs))
-
-        marian_futures = {executor.submit(translate_text_marian, para, tokenizer, model): idx for idx, para in enumerate(paragraphs)}
-        for i, future in enumerate(as_completed(marian_futures)):
-            idx = marian_futures[future]
-            marian_translations[idx] = future.result() or "Помилка перекладу"
-            marian_progress.progress((i + 1) / len(paragraphs))
-
-        openai_futures = {executor.submit(translate_text_openai, para): idx for idx, para in enumerate(paragraphs)}
-        for i, future in enumerate(as_completed(openai_futures)):
-            idx = openai_futures[future]
-            openai_translations[idx] = future.result() or "Помилка перекладу"
-            openai_progress.progress((i + 1) / len(paragraphs))
+def build_results_frame(store):
+    """Формує стовпці таблиці результатів для st.dataframe."""
+    frame = {"Оригінал": store.source}
+    for engine in store.engines:
+        frame[ENGINE_LABELS[engine]] = store.column(engine)
+    if store.agreement is not None:
+        frame[f"Узгодженість ({METRIC_NAME})"] = store.agreement
+        frame["Ризик"] = store.risk
+    if store.changes is not None:
+        frame["Зміна"] = build_change_marks(store)
+    return frame
 
-    # Перевірка
-    if all(not para for para in google_translations + marian_translations + openai_translations):
-        logging.error("Усі переклади порожні. Документ не буде створено.")
-        st.error("Переклад не виконався. Будь ласка, перевірте введений текст або джерело.")
+def render_partial_download(placeholder, store, base_name, revision):
+    """Оновлює кнопку завантаження часткових результатів."""
+    placeholder.download_button(
+        label="Завантажити часткові результати (Markdown)",
+        data=build_markdown(store).encode("utf-8"),
+        file_name=f"{base_name}_Partial.md",
+        mime="text/markdown",
+        key=f"partial_download_{revision}",
+        on_click="ignore",  # Не перезапускати сторінку, щоб не перервати переклад
+    )
+
+def offer_download(label, file_path, mime):
+    """
+    Віддає файл артефакту через файловий дескриптор, який одразу закривається.
+    Натискання не перезапускає сторінку, тож решта кнопок завантаження лишаються.
+    """
+    with artifacts.open_artifact(file_path) as f:
+        st.download_button(label=label, data=f, file_name=os.path.basename(file_path), mime=mime, on_click="ignore")
+
+def version_name_input(default):
+    """Поле з назвою документа, за якою зберігається та шукається його версія."""
+    name = st.text_input(
+        "Назва документа для порівняння версій:", value=default,
+        help="Переклад зберігається як версія документа з цією назвою, і наступна редакція "
+             "порівнюється з нею. Якщо нова редакція має інше ім'я файлу, вкажіть тут назву попередньої.",
+    )
+    return name.strip() or default
+
+# Функція обробки перекладу: кожна задача отримує власний каталог артефактів,
+# який видаляється, якщо переклад завершився помилкою або був перерваний
+def process_translation(paragraphs, base_name, source, target, version_name=None, incremental=False, mark_changes=False):
+    source = resolve_source(source, paragraphs)
+    if source == target:
+        st.error("Мова оригіналу збігається з мовою перекладу.")
         return False
+    st.info(f"Мовна пара: {LANGUAGE_LABELS[source]} → {LANGUAGE_LABELS[target]}")
+    job_id, job_dir = artifacts.start_job()
+    succeeded = False
+    try:
+        succeeded = translate_document(paragraphs, base_name, job_id, job_dir, source, target, version_name, incremental, mark_changes)
+        return succeeded
+    finally:
+        # Якщо сесію перервано, завдання задачі не повинні займати черги рушіїв
+        governor.cancel_job(job_id)
+        if succeeded:
+            artifacts.finish_job(job_id)
+        else:
+            artifacts.fail_job(job_id)
 
-    # Генерація Markdown-файлу
-    markdown_content = create_translation_table_markdown(paragraphs, google_translations, marian_translations, openai_translations)
-    markdown_file = os.path.join(TEMP_DIR, f"{base_name}_Translated.md")
-    logging.info(f"Створення Markdown-файлу: {markdown_file}")
+def translate_document(paragraphs, base_name, job_id, job_dir, source, target, version_name, incremental, mark_changes):
+    engines = get_engine_functions(glossary, source, target)
+    store = ResultStore(paragraphs, engines=list(engines), source_lang=source, target_lang=target)
 
-    with open(markdown_file, "w", encoding="utf-8") as f:
-        f.write(markdown_content)
+    # Результат зберігається як версія документа version_name; абзаци, що не
+    # змінилися з попередньої версії, беруться з неї
+    version_file = version_path(version_name, source, target, glossary) if version_name else None
+    previous_rows = load_version(version_file) if version_file and incremental else None
+    if previous_rows:
+        stats = prefill_from_version(store, previous_rows, mark_changes)
+        st.info(
+            f"Порівняння з попередньою версією: без змін {stats['unchanged'] + stats['moved']}, "
+            f"змінено {stats['modified']}, нових {stats['inserted']}, видалено {stats['removed']}. "
+            f"Перевикористано перекладів: {stats['reused']}, до перекладу: {stats['to_translate']}."
+        )
 
-    # Конвертація в DOCX
-    output_file = os.path.join(TEMP_DIR, f"{base_name}_Translated.docx")
-    pandoc_command = f'pandoc -f markdown -t docx "{markdown_file}" -o "{output_file}"'
-    conversion_result = os.system(pandoc_command)
-    if conversion_result != 0:
-        logging.error("Помилка при конвертації Markdown в DOCX.")
-        st.error("Не вдалося створити DOCX-файл.")
+    # Прогрес бари
+    progress_bars = {}
+    for engine in engines:
+        st.write(f"Прогрес перекладу {ENGINE_LABELS[engine]}:")
+        progress_bars[engine] = st.progress(0)
+
+    # Таблиця, що заповнюється в міру надходження результатів
+    st.write("Результати перекладу:")
+    table_placeholder = st.empty()
+    download_placeholder = st.empty()
+    table_placeholder.dataframe(build_results_frame(store))
+
+    # Оновлення інтерфейсу відбувається лише в цьому потоці і не частіше
+    # ніж раз на RENDER_INTERVAL, тому робочі потоки не чекають на рендеринг
+    render_state = {"last_render": time.monotonic(), "revision": 0}
+
+    def render_progress(store):
+        now = time.monotonic()
+        if now - render_state["last_render"] < RENDER_INTERVAL:
+            return
+        render_state["last_render"] = now
+        render_state["revision"] += 1
+        for name, bar in progress_bars.items():
+            bar.progress(store.progress(name))
+        table_placeholder.dataframe(build_results_frame(store))
+        render_partial_download(download_placeholder, store, base_name, render_state["revision"])
+
+    # Завдання передаються у спільний для всіх сесій диспетчер рушіїв, який
+    # обмежує паралельність кожного рушія та чергує задачі різних користувачів;
+    # модель MarianMT нової мовної пари завантажується заздалегідь у цій сесії
+    with st.spinner("Підготовка моделей перекладу..."):
+        preload_models(engines, source, target)
+    store = run_translation_job(paragraphs, engines, governor, job_id, on_result=render_progress, store=store)
+
+    # Оцінка узгодженості рушіїв: рядки з високим ризиком варто перевірити першими
+    store.set_agreement(score_agreement(store.source, {engine: store.column(engine) for engine in store.engines}))
+    risky_rows = int((store.risk >= RISK_THRESHOLD).sum())
+
+    # Фінальне оновлення таблиці та прогресу
+    for name, bar in progress_bars.items():
+        bar.progress(store.progress(name))
+    table_placeholder.dataframe(build_results_frame(store))
+    download_placeholder.empty()
+    if risky_rows:
+        st.warning(f"Рядків із розбіжностями між рушіями: {risky_rows}. Відсортуйте таблицю за стовпцем «Ризик».")
+
+    # Перевірка
+    if store.all_empty():
+        logging.error("Усі переклади порожні. Документ не буде створено.")
+        st.error("Переклад не виконався. Будь ласка, перевірте введений текст або джерело.")
         return False
+    if version_file:
+        save_version(store, version_file)
 
-    # Застосування стилів через apply_styles_directly
-    styled_file = apply_styles_directly(output_file)
+    # Генерація Markdown, конвертація в DOCX та застосування стилів
+    styled_file = export_docx(store, os.path.join(job_dir, f"{base_name}_Translated.docx"))
     if not styled_file:
-        st.error("Не вдалося застосувати стилі до документа.")
+        st.error("Не вдалося створити DOCX-файл.")
         return False
 
     # Вивантаження файлу
     st.success("Переклад завершено!")
-    st.download_button(
-        label="Завантажити таблицю DOCX",
-        data=open(styled_file, "rb").read(),
-        file_name=os.path.basename(styled_file),
-        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-    )
+    offer_download("Завантажити таблицю DOCX", styled_file, "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+
+    # Додаткові формати: таблиця Excel, JSONL та пам'ять перекладів TMX
+    exports = [
+        ("Завантажити таблицю XLSX", export_xlsx, "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+        ("Завантажити JSONL", export_jsonl, "jsonl", "application/x-ndjson"),
+        ("Завантажити TMX", export_tmx, "tmx", "application/x-tmx+xml"),
+    ]
+    for label, exporter, ext, mime in exports:
+        export_file = exporter(store, os.path.join(job_dir, f"{base_name}_Translated.{ext}"))
+        offer_download(label, export_file, mime)
     return True
 
+# Переклад DOCX зі збереженням форматування обраним рушієм
+def process_in_place_translation(file_path, base_name, engine, source, target):
+    source = resolve_source(source, iter_docx_paragraphs(file_path))
+    if source == target:
+        st.error("Мова оригіналу збігається з мовою перекладу.")
+        return False
+    st.info(f"Мовна пара: {LANGUAGE_LABELS[source]} → {LANGUAGE_LABELS[target]}")
+    translate_functions = get_engine_functions(glossary, source, target)
+    job_id, job_dir = artifacts.start_job()
+    succeeded = False
+    try:
+        output_file = os.path.join(job_dir, f"{base_name}_{ENGINE_LABELS[engine].replace(' ', '')}.docx")
+        with st.spinner(f"Переклад документа ({ENGINE_LABELS[engine]})..."):
+            preload_models([engine], source, target)
+            stats = translate_docx_in_place(
+                file_path, output_file, translate_functions[engine], is_error=is_error,
+                submit=lambda fn, *args: governor.submit(engine, job_id, fn, *args),
+            )
+        if stats["translated"] == 0:
+            st.error("Переклад не виконався. Будь ласка, перевірте документ або спробуйте інший рушій.")
+            return False
+        if stats["failed"]:
+            st.warning(f"Не вдалося перекласти абзаців: {stats['failed']} (залишено мовою оригіналу).")
+        st.success(f"Переклад завершено! Перекладено абзаців: {stats['translated']}.")
+        offer_download("Завантажити перекладений DOCX", output_file, "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        succeeded = True
+        return True
+    finally:
+        governor.cancel_job(job_id)
+        if succeeded:
+            artifacts.finish_job(job_id)
+        else:
+            artifacts.fail_job(job_id)
+
 # Головна логіка
 if section == "Головна сторінка":
     st.title("LegalTransUA")
@@ -136,28 +296,65 @@ if section == "Головна сторінка":
 
     type_of_source = st.radio("Оберіть тип джерела:", ["Файл", "URL"])
 
+    # Мовна пара задачі; мову оригіналу можна визначити за текстом документа
+    source_options = [AUTO, *SOURCE_LANGUAGES]
+    target_options = list(LANGUAGE_LABELS)
+    source_column, target_column = st.columns(2)
+    source_language = source_column.selectbox(
+        "Мова оригіналу:", source_options,
+        format_func=lambda code: "Визначити автоматично" if code == AUTO else LANGUAGE_LABELS[code],
+    )
+    target_language = target_column.selectbox(
+        "Мова перекладу:", target_options, index=target_options.index(DEFAULT_TARGET), format_func=LANGUAGE_LABELS.get,
+    )
+
+    # Нова редакція документа з тією самою назвою (за замовчуванням ім'я файлу
+    # або URL) перекладається інкрементно: рушіям надсилаються лише нові та
+    # змінені абзаци
+    incremental = st.checkbox(
+        "Перекладати лише змінені абзаци (порівняння з попередньою версією)", value=True,
+        help="Попередня версія шукається за назвою документа (див. поле нижче), а не за вмістом.",
+    )
+    mark_changes = st.checkbox("Позначити зміни в таблиці", value=False, disabled=not incremental)
+
     if type_of_source == "Файл":
         uploaded_file = st.file_uploader("Завантажте файл (DOCX або PDF):", type=["docx", "pdf"])
         if uploaded_file:
-            file_path = save_uploaded_file(uploaded_file)
+            file_path, digest = save_uploaded_file(uploaded_file)
             base_name, ext = os.path.splitext(uploaded_file.name)
             if ext.lower() not in [".docx", ".pdf"]:
                 st.error("Підтримуються лише файли у форматах DOCX або PDF.")
             else:
                 st.success(f"Файл '{uploaded_file.name}' успішно завантажено.")
-                if st.button("Розпочати переклад"):
-                    paragraphs = extract_text(file_path)
-                    if paragraphs:
-                        process_translation(paragraphs, base_name)
-                    else:
-                        st.error("Не вдалося отримати текст із документа.")
+                mode = "Таблиця порівняння перекладів"
+                if ext.lower() == ".docx":
+                    mode = st.radio("Режим перекладу:", ["Таблиця порівняння перекладів", "Переклад DOCX зі збереженням форматування"])
+                if mode == "Переклад DOCX зі збереженням форматування":
+                    engine = st.selectbox("Рушій перекладу:", list(ENGINE_LABELS), format_func=ENGINE_LABELS.get)
+                    if st.button("Розпочати переклад"):
+                        process_in_place_translation(file_path, base_name, engine, source_language, target_language)
+                else:
+                    version_name = version_name_input(uploaded_file.name)
+                    if st.button("Розпочати переклад"):
+                        paragraphs = cached_extract(file_path, digest, extract_text, EXTRACTOR_VERSION)
+                        if paragraphs:
+                            process_translation(
+                                paragraphs, base_name, source_language, target_language,
+                                version_name=version_name, incremental=incremental, mark_changes=mark_changes,
+                            )
+                        else:
+                            st.error("Не вдалося отримати текст із документа.")
 
     elif type_of_source == "URL":
         url = st.text_input("Введіть URL:")
+        version_name = version_name_input(url) if url else None
         if url and st.button("Розпочати переклад"):
             paragraphs = extract_text_from_url(url)
             if paragraphs:
-                process_translation(paragraphs, "URL_translation")
+                process_translation(
+                    paragraphs, "URL_translation", source_language, target_language,
+                    version_name=version_name, incremental=incremental, mark_changes=mark_changes,
+                )
             else:
                 st.warning("Не вдалося знайти текст на сторінці.")
 
@@ -165,7 +362,7 @@ elif section == "Про додаток":
     st.title("Про LegalTransUA")
     st.write("**LegalTransUA** — це інноваційний додаток для автоматизації перекладу юридичних документів.")
     st.write("### Основні можливості:")
-    st.write("- Переклад тексту з англійської на українську.")
+    st.write("- Переклад тексту з англійської, німецької та французької на українську.")
     st.write("- Генерація таблиць із перекладом.")
     st.write("- Інтеграція із сучасними AI-інструментами.")
 
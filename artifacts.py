@@ -0,0 +1,160 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: лише перевірка наявності файлу-маркера
+    fcntl = None
+
+# Результати кожного перекладу зберігаються в окремому каталозі temp/jobs/<job_id>
+ARTIFACT_DIR = os.path.join("temp", "jobs")
+
+# Загальний ліміт розміру артефактів та час їх життя (налаштовуються через .env)
+DEFAULT_QUOTA_BYTES = int(float(os.getenv("ARTIFACT_QUOTA_MB", "500")) * 1024 * 1024)
+DEFAULT_TTL_SECONDS = float(os.getenv("ARTIFACT_TTL_HOURS", "24")) * 3600
+
+# Файл-маркер задачі, що виконується. Процес, який веде задачу, тримає на ньому
+# блокування flock, тому Streamlit-сторінка, HTTP API та інші процеси зі спільним
+# каталогом артефактів не видаляють чужі активні задачі; після аварійного
+# завершення процесу блокування знімається і задача знову може бути витіснена.
+ACTIVE_MARKER = ".active"
+
+def _held_elsewhere(job_dir):
+    """Чи виконується задача в іншому процесі (маркер заблоковано)."""
+    marker = os.path.join(job_dir, ACTIVE_MARKER)
+    if not os.path.exists(marker):
+        return False
+    if fcntl is None:
+        return True
+    try:
+        with open(marker, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            fcntl.flock(f, fcntl.LOCK_UN)
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    return False
+
+def _dir_size(path):
+    total = 0
+    for foldername, subfolders, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(foldername, filename))
+            except OSError:
+                pass
+    return total
+
+class ArtifactManager:
+    """
+    Керує каталогами артефактів перекладу з обмеженням загального розміру.
+
+    Час останнього використання задачі - це mtime її каталогу (оновлюється
+    через touch()). Під час enforce() спершу видаляються задачі, старші за
+    TTL, потім найдавніше використані (LRU), доки сумарний розмір не стане
+    меншим за квоту. Задачі, що ще виконуються в будь-якому процесі (див.
+    ACTIVE_MARKER), не видаляються.
+    """
+
+    def __init__(self, root=ARTIFACT_DIR, quota_bytes=DEFAULT_QUOTA_BYTES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.ttl_seconds = ttl_seconds
+        self._active = {}  # job_id -> відкритий файл-маркер із блокуванням
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def job_path(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def start_job(self):
+        """Створює каталог для нової задачі та повертає (job_id, шлях)."""
+        self.enforce()
+        job_id = uuid.uuid4().hex
+        job_dir = self.job_path(job_id)
+        os.makedirs(job_dir)
+        marker = open(os.path.join(job_dir, ACTIVE_MARKER), "wb")
+        if fcntl is not None:
+            fcntl.flock(marker, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        with self._lock:
+            self._active[job_id] = marker
+        return job_id, job_dir
+
+    def _release(self, job_id):
+        """Знімає позначку активної задачі; повертає False, якщо задача вже не активна."""
+        with self._lock:
+            marker = self._active.pop(job_id, None)
+        if marker is None:
+            return False
+        marker.close()
+        try:
+            os.remove(os.path.join(self.job_path(job_id), ACTIVE_MARKER))
+        except OSError:
+            pass
+        return True
+
+    def finish_job(self, job_id):
+        """Позначає задачу завершеною; її артефакти стають кандидатами на витіснення."""
+        self._release(job_id)
+        self.touch(job_id)
+        self.enforce()
+
+    def fail_job(self, job_id):
+        """Видаляє всі артефакти задачі, що завершилася помилкою."""
+        self._release(job_id)
+        shutil.rmtree(self.job_path(job_id), ignore_errors=True)
+        logging.info(f"Артефакти задачі {job_id} видалено після помилки.")
+
+    def touch(self, job_id):
+        """Оновлює час останнього використання задачі."""
+        try:
+            os.utime(self.job_path(job_id))
+        except OSError:
+            pass
+
+    def open_artifact(self, path):
+        """Відкриває файл артефакту для читання та оновлює час використання задачі."""
+        self.touch(os.path.basename(os.path.dirname(path)))
+        return open(path, "rb")
+
+    def enforce(self):
+        """Видаляє прострочені та найдавніше використані задачі понад квоту."""
+        now = time.time()
+        with self._lock:
+            active = set(self._active)
+
+        jobs = []
+        held_size = 0
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if not entry.is_dir() or entry.name in active:
+                continue
+            if _held_elsewhere(entry.path):
+                held_size += _dir_size(entry.path)
+                continue
+            try:
+                last_used = entry.stat().st_mtime
+            except OSError:
+                continue
+            if now - last_used > self.ttl_seconds:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                logging.info(f"Артефакти задачі {entry.name} видалено (минув TTL).")
+                continue
+            jobs.append((last_used, entry.name, entry.path, _dir_size(entry.path)))
+
+        total = sum(size for _, _, _, size in jobs) + held_size
+        total += sum(_dir_size(self.job_path(job_id)) for job_id in active)
+        for last_used, job_id, path, size in sorted(jobs):
+            if total <= self.quota_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            logging.info(f"Артефакти задачі {job_id} витіснено (перевищено квоту).")
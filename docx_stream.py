@@ -0,0 +1,193 @@
+import shutil
+import logging
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W_DOCUMENT = f"{{{W_NS}}}document"
+W_BODY = f"{{{W_NS}}}body"
+W_P = f"{{{W_NS}}}p"
+W_R = f"{{{W_NS}}}r"
+W_T = f"{{{W_NS}}}t"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+DOCUMENT_XML = "word/document.xml"
+
+# Скільки елементів тіла документа (абзаців, таблиць) може одночасно чекати
+# на переклад; обмежує пам'ять при потоковій обробці великих документів
+PENDING_WINDOW = 64
+
+# -------------------- Групування тексту за абзацами --------------------
+
+def paragraph_text_nodes(paragraph):
+    """
+    Повертає вузли w:t, що належать саме цьому абзацу (без тексту вкладених
+    абзаців, наприклад у текстових полях).
+    """
+    nodes = []
+    for node in paragraph.iter(W_T):
+        parent = node.getparent()
+        while parent is not None and parent.tag != W_P:
+            parent = parent.getparent()
+        if parent is paragraph:
+            nodes.append(node)
+    return nodes
+
+def paragraph_text(nodes):
+    return "".join(node.text or "" for node in nodes)
+
+def _iter_body_children(xml_stream):
+    """
+    Потоково розбирає document.xml і повертає пари (подія, елемент).
+    Завершені дочірні елементи w:body повертаються з подією "child" і після
+    обробки мають бути звільнені викликом _release().
+    """
+    for event, elem in etree.iterparse(xml_stream, events=("start", "end"), huge_tree=True):
+        if event == "end":
+            parent = elem.getparent()
+            if parent is not None and parent.tag == W_BODY:
+                yield "child", elem
+                continue
+        yield event, elem
+
+def _release(elem):
+    """Звільняє пам'ять, зайняту вже обробленим елементом."""
+    elem.clear()
+    parent = elem.getparent()
+    if parent is not None:
+        parent.remove(elem)
+
+def iter_docx_paragraphs(file_path):
+    """
+    Потоково повертає текст абзаців DOCX-файлу (усі w:t одного w:p
+    об'єднуються), не завантажуючи весь документ у пам'ять.
+    """
+    with zipfile.ZipFile(file_path, "r") as docx:
+        with docx.open(DOCUMENT_XML) as xml_stream:
+            for event, elem in _iter_body_children(xml_stream):
+                if event != "child":
+                    continue
+                for paragraph in elem.iter(W_P):
+                    text = paragraph_text(paragraph_text_nodes(paragraph)).strip()
+                    if text:
+                        yield text
+                _release(elem)
+
+# -------------------- Переклад зі збереженням форматування --------------------
+
+def _write_detached(xf, elem):
+    """
+    Записує елемент у вихідний потік і звільняє його. Елемент спершу
+    від'єднується від дерева, щоб lxml оголосив у ньому лише ті простори
+    імен, які справді використовуються, а не всі простори імен кореня.
+    """
+    elem.getparent().remove(elem)
+    xf.write(elem)
+    elem.clear()
+
+def _write_translation(paragraph, nodes, translation):
+    """
+    Записує переклад у текстовий вузол першого фрагмента (w:r), що є прямим
+    нащадком абзацу, а решту вузлів очищає, тому форматування цього фрагмента
+    поширюється на весь абзац. Фрагменти всередині гіперпосилань і полів
+    пропускаються, інакше весь переклад став би текстом посилання; лише якщо
+    інших фрагментів немає, використовується перший текстовий вузол.
+    """
+    target = next(
+        (node for node in nodes if node.getparent().tag == W_R and node.getparent().getparent() is paragraph),
+        nodes[0],
+    )
+    target.text = translation
+    target.set(XML_SPACE, "preserve")
+    for node in nodes:
+        if node is not target:
+            node.text = ""
+
+def translate_docx_in_place(src_path, dst_path, translate_fn, max_workers=4, is_error=None, submit=None):
+    """
+    Створює перекладену копію DOCX-файлу зі збереженням форматування.
+
+    word/document.xml обробляється потоково за один прохід: кожен завершений
+    елемент тіла документа відправляється на переклад, а після отримання
+    результатів одразу записується у вихідний файл і звільняється. Решта
+    частин архіву копіюються без змін. Абзаци, для яких рушій повернув
+    помилку, залишаються мовою оригіналу.
+
+    submit(fn, *args) -> Future дозволяє передати виклики в зовнішній
+    диспетчер (наприклад, governor.EngineGovernor); інакше використовується
+    власний пул із max_workers потоків. Повертає словник зі статистикою.
+    """
+    stats = {"paragraphs": 0, "translated": 0, "failed": 0}
+
+    with zipfile.ZipFile(src_path, "r") as zin, zipfile.ZipFile(dst_path, "w") as zout:
+        for info in zin.infolist():
+            target_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+            target_info.compress_type = info.compress_type
+            target_info.external_attr = info.external_attr
+            with zin.open(info) as src, zout.open(target_info, "w") as dst:
+                if info.filename == DOCUMENT_XML:
+                    if submit is not None:
+                        _translate_document_xml(src, dst, translate_fn, submit, is_error, stats)
+                    else:
+                        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                            _translate_document_xml(src, dst, translate_fn, executor.submit, is_error, stats)
+                else:
+                    shutil.copyfileobj(src, dst)
+
+    logging.info(
+        f"Документ перекладено зі збереженням форматування: {dst_path} "
+        f"(абзаців: {stats['paragraphs']}, перекладено: {stats['translated']}, помилок: {stats['failed']})"
+    )
+    return stats
+
+def _translate_document_xml(src, dst, translate_fn, submit, is_error, stats):
+    pending = deque()
+
+    def write_oldest(xf):
+        elem, jobs = pending.popleft()
+        for paragraph, nodes, future in jobs:
+            translation = future.result()
+            if not translation or (is_error and is_error(translation)):
+                stats["failed"] += 1
+                continue
+            _write_translation(paragraph, nodes, translation)
+            stats["translated"] += 1
+        _write_detached(xf, elem)
+
+    with etree.xmlfile(dst, encoding="utf-8") as xf:
+        xf.write_declaration(standalone=True)
+        open_elements = []
+        for event, elem in _iter_body_children(src):
+            if event == "start":
+                # Відкриваємо w:document з тими ж атрибутами та просторами імен
+                # (mc:Ignorable посилається на них), а w:body їх успадковує
+                if elem.tag == W_DOCUMENT:
+                    context = xf.element(elem.tag, attrib=dict(elem.attrib), nsmap=elem.nsmap)
+                    context.__enter__()
+                    open_elements.append(context)
+                elif elem.tag == W_BODY and elem.getparent() is not None and elem.getparent().tag == W_DOCUMENT:
+                    context = xf.element(elem.tag, attrib=dict(elem.attrib))
+                    context.__enter__()
+                    open_elements.append(context)
+            elif event == "child":
+                jobs = []
+                for paragraph in elem.iter(W_P):
+                    nodes = paragraph_text_nodes(paragraph)
+                    text = paragraph_text(nodes)
+                    if text.strip():
+                        stats["paragraphs"] += 1
+                        jobs.append((paragraph, nodes, submit(translate_fn, text)))
+                pending.append((elem, jobs))
+                while len(pending) > PENDING_WINDOW:
+                    write_oldest(xf)
+            elif elem.tag == W_BODY:
+                while pending:
+                    write_oldest(xf)
+                open_elements.pop().__exit__(None, None, None)
+            elif elem.tag == W_DOCUMENT:
+                open_elements.pop().__exit__(None, None, None)
+            elif elem.getparent() is not None and elem.getparent().tag == W_DOCUMENT:
+                # Інші дочірні елементи w:document (наприклад, w:background)
+                _write_detached(xf, elem)
@@ -0,0 +1,92 @@
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape, quoteattr
+from openpyxl import Workbook
+
+from result_store import ENGINE_LABELS, CHANGE_LABELS
+from agreement import METRIC_NAME
+
+# Символи, недопустимі в XML 1.0 та в клітинках XLSX
+INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _clean(text):
+    return INVALID_XML_CHARS.sub("", text or "")
+
+# -------------------- Експорт результатів --------------------
+
+def export_jsonl(store, output_file):
+    """Записує результати у JSONL: один рядок на абзац."""
+    with open(output_file, "w", encoding="utf-8") as f:
+        for row in store.iter_rows():
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write("\n")
+    logging.info(f"JSONL-файл збережено: {output_file}")
+    return output_file
+
+def export_xlsx(store, output_file):
+    """
+    Записує результати в XLSX у режимі write-only: рядки одразу
+    серіалізуються на диск, тому пам'ять не залежить від розміру таблиці.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Translation")
+    headers = ["#", "Оригінал"]
+    for engine in store.engines:
+        headers += [ENGINE_LABELS.get(engine, engine), f"{engine}, с", f"{engine}, помилка"]
+    if store.agreement is not None:
+        headers += [f"Узгодженість ({METRIC_NAME})", "Ризик"]
+    if store.changes is not None:
+        headers.append("Зміна")
+    sheet.append(headers)
+
+    for row in store.iter_rows():
+        values = [row["id"], _clean(row["source"])]
+        for engine in store.engines:
+            values += [_clean(row[engine]), row[f"{engine}_seconds"], "так" if row[f"{engine}_error"] else ""]
+        if store.agreement is not None:
+            values += [row["agreement"], row["risk"]]
+        if store.changes is not None:
+            values.append(CHANGE_LABELS[row["change"]])
+        sheet.append(values)
+
+    workbook.save(output_file)
+    logging.info(f"XLSX-файл збережено: {output_file}")
+    return output_file
+
+def export_tmx(store, output_file, engines=None, source_lang=None, target_lang=None):
+    """
+    Записує пари «оригінал - переклад» у форматі TMX 1.4 для CAT-інструментів
+    та пам'ятей перекладів. Кожен рушій дає окремий блок <tu> з властивістю
+    x-engine; порожні та помилкові переклади пропускаються. Мови за
+    замовчуванням беруться з мовної пари задачі (store).
+    """
+    engines = engines or store.engines
+    source_lang = source_lang or store.source_lang
+    target_lang = target_lang or store.target_lang
+    created = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<tmx version="1.4">\n')
+        f.write(
+            f'  <header creationtool="LegalTransUA" creationtoolversion="1.0" datatype="plaintext" '
+            f'segtype="paragraph" adminlang="en" srclang={quoteattr(source_lang)} o-tmf="LegalTransUA" '
+            f'creationdate="{created}"/>\n'
+        )
+        f.write("  <body>\n")
+        for idx in range(len(store)):
+            source = _clean(store.source[idx]).strip()
+            if not source:
+                continue
+            for engine in engines:
+                if store.errors[engine][idx] or not store.done[engine][idx]:
+                    continue
+                f.write(f'    <tu tuid="{store.ids[idx]}-{engine}">\n')
+                f.write(f'      <prop type="x-engine">{escape(engine)}</prop>\n')
+                f.write(f"      <tuv xml:lang={quoteattr(source_lang)}><seg>{escape(source)}</seg></tuv>\n")
+                f.write(f"      <tuv xml:lang={quoteattr(target_lang)}><seg>{escape(_clean(store.translations[engine][idx]))}</seg></tuv>\n")
+                f.write("    </tu>\n")
+        f.write("  </body>\n</tmx>\n")
+    logging.info(f"TMX-файл збережено: {output_file}")
+    return output_file
@@ -0,0 +1,217 @@
+import os
+import csv
+import hashlib
+import logging
+import pickle
+import re
+from collections import deque
+
+# Версія формату скомпільованого глосарію. Збільшуйте при зміні структури
+# автомата, щоб старі файли кешу не використовувалися.
+GLOSSARY_VERSION = 1
+
+# Каталог для скомпільованих глосаріїв
+GLOSSARY_CACHE_DIR = os.path.join("cache", "glossary")
+
+# Шаблон заповнювача, який підставляється замість терміна перед перекладом.
+# Рушії перекладу зазвичай залишають такі токени без змін, але інколи
+# додають пробіли всередині дужок, змінюють регістр або транслітерують
+# латинську T у кириличну Т, тому відновлення все це допускає.
+PLACEHOLDER_TEMPLATE = "[[T{}]]"
+PLACEHOLDER_PATTERN = re.compile(r"\[\[\s*[TtТт]\s*(\d+)\s*\]\]")
+
+def _fold(ch):
+    """Нормалізує регістр символу без зміни довжини рядка."""
+    lowered = ch.lower()
+    return lowered if len(lowered) == 1 else ch
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+class Glossary:
+    """
+    Глосарій юридичних термінів, скомпільований в автомат Ахо-Корасік.
+
+    Усі терміни шукаються одночасно за один лінійний прохід по абзацу,
+    незалежно від кількості записів у глосарії.
+    """
+
+    def __init__(self, entries):
+        # entries: список пар (термін англійською, обов'язковий переклад)
+        self.terms = []
+        self.translations = []
+        self._goto = [{}]
+        self._fail = [0]
+        # Для кожного стану: список (довжина терміна, індекс терміна)
+        self._output = [[]]
+        # Хеш вмісту файлу глосарію (задається в load_glossary)
+        self.digest = None
+
+        for term, translation in entries:
+            term = (term or "").strip()
+            translation = (translation or "").strip()
+            if not term or not translation:
+                continue
+            self._add_term(term, len(self.terms))
+            self.terms.append(term)
+            self.translations.append(translation)
+
+        self._build_failure_links()
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _add_term(self, term, term_index):
+        state = 0
+        for ch in term:
+            ch = _fold(ch)
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        if not self._output[state]:
+            self._output[state].append((len(term), term_index))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                # Успадковуємо виходи суфіксного стану, щоб під час пошуку
+                # не ходити ланцюжком посилань
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """
+        Повертає неперекривні входження термінів у тексті як список
+        (початок, кінець, індекс терміна). Перевага віддається найлівішому,
+        а серед них - найдовшому збігу; враховуються лише цілі слова.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        best = {}  # початок -> (кінець, індекс терміна)
+        state = 0
+        length = len(text)
+        for pos, ch in enumerate(text):
+            ch = _fold(ch)
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not output[state]:
+                continue
+            end = pos + 1
+            if end < length and _is_word_char(text[end]):
+                continue
+            for term_length, term_index in output[state]:
+                start = end - term_length
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                current = best.get(start)
+                if current is None or current[0] < end:
+                    best[start] = (end, term_index)
+
+        matches = []
+        last_end = 0
+        for start in sorted(best):
+            end, term_index = best[start]
+            if start >= last_end:
+                matches.append((start, end, term_index))
+                last_end = end
+        return matches
+
+    def protect(self, text):
+        """
+        Замінює терміни глосарію заповнювачами перед відправленням на переклад.
+        Повертає (текст із заповнювачами, список індексів термінів).
+        """
+        if not text:
+            return text, []
+        parts = []
+        protected = []
+        last_end = 0
+        for start, end, term_index in self.find(text):
+            parts.append(text[last_end:start])
+            parts.append(PLACEHOLDER_TEMPLATE.format(len(protected)))
+            protected.append(term_index)
+            last_end = end
+        if not protected:
+            return text, []
+        parts.append(text[last_end:])
+        return "".join(parts), protected
+
+    def restore(self, text, protected):
+        """
+        Підставляє обов'язкові переклади термінів замість заповнювачів.
+        Повертає None, якщо рушій загубив, продублював або вигадав заповнювач:
+        тоді частина термінів у перекладі відсутня або стоїть не на своєму місці.
+        """
+        if not protected:
+            return text
+        if not text:
+            return None
+
+        restored = []
+
+        def replace(match):
+            slot = int(match.group(1))
+            restored.append(slot)
+            if slot >= len(protected):
+                return match.group(0)
+            return self.translations[protected[slot]]
+
+        text = PLACEHOLDER_PATTERN.sub(replace, text)
+        if sorted(restored) != list(range(len(protected))):
+            return None
+        return text
+
+# -------------------- Завантаження та кешування --------------------
+
+def read_glossary_entries(file_path):
+    """Читає CSV/TSV-файл глосарію з двома стовпцями: термін і переклад."""
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        delimiter = "\t" if "\t" in sample else ","
+        return [(row[0], row[1]) for row in csv.reader(f, delimiter=delimiter) if len(row) >= 2]
+
+def load_glossary(file_path, cache_dir=GLOSSARY_CACHE_DIR):
+    """
+    Завантажує глосарій, використовуючи скомпільований автомат із дискового
+    кешу, якщо вміст файлу не змінився.
+    """
+    with open(file_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    cache_file = os.path.join(cache_dir, f"{digest}-v{GLOSSARY_VERSION}.pkl")
+
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, "rb") as f:
+                glossary = pickle.load(f)
+            glossary.digest = digest
+            logging.info(f"Глосарій завантажено з кешу: {cache_file}")
+            return glossary
+        except Exception as e:
+            logging.warning(f"Не вдалося прочитати кеш глосарію {cache_file}: {e}")
+
+    glossary = Glossary(read_glossary_entries(file_path))
+    glossary.digest = digest
+    logging.info(f"Глосарій скомпільовано: {len(glossary)} термінів.")
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "wb") as f:
+            pickle.dump(glossary, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        logging.warning(f"Не вдалося зберегти кеш глосарію: {e}")
+    return glossary
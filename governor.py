@@ -0,0 +1,152 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+# Глобальні (на весь процес) ліміти одночасних запитів до кожного рушія.
+# MarianMT - одна модель у пам'яті, тому за замовчуванням один потік.
+DEFAULT_LIMITS = {
+    "google": int(os.getenv("GOOGLE_CONCURRENCY", "4")),
+    "marian": int(os.getenv("MARIAN_CONCURRENCY", "1")),
+    "openai": int(os.getenv("OPENAI_CONCURRENCY", "4")),
+}
+
+class _EngineQueue:
+    """
+    Черга одного рушія з фіксованою кількістю робочих потоків.
+
+    Завдання зберігаються окремо для кожної задачі (job), а робочі потоки
+    беруть по одному завданню від задач по колу (round-robin), тому велика
+    задача не блокує дрібні задачі інших користувачів.
+    """
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = max(1, limit)
+        self.jobs = OrderedDict()  # job_id -> deque завдань
+        self.condition = threading.Condition()
+        self.active = 0
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.closed = False
+        self.workers = [
+            threading.Thread(target=self._work, name=f"{name}-worker-{i}", daemon=True)
+            for i in range(self.limit)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def put(self, job_id, task):
+        with self.condition:
+            self.jobs.setdefault(job_id, deque()).append(task)
+            self.condition.notify()
+
+    def cancel_job(self, job_id):
+        with self.condition:
+            tasks = self.jobs.pop(job_id, ())
+        # Після cancel() майбутнє потрібно перевести в стан CANCELLED_AND_NOTIFIED,
+        # інакше as_completed()/wait() у потоці задачі ніколи не прокинуться
+        for future, *_ in tasks:
+            future.cancel()
+            future.set_running_or_notify_cancel()
+        return len(tasks)
+
+    def _next_task(self):
+        with self.condition:
+            while not self.jobs and not self.closed:
+                self.condition.wait()
+            if not self.jobs:
+                return None
+            job_id, tasks = next(iter(self.jobs.items()))
+            task = tasks.popleft()
+            if tasks:
+                self.jobs.move_to_end(job_id)
+            else:
+                del self.jobs[job_id]
+            wait = time.monotonic() - task[-1]
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.active += 1
+            return task
+
+    def _work(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            future, fn, args, kwargs, enqueued_at = task
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self.condition:
+                    self.active -= 1
+                    self.completed += 1
+
+    def snapshot(self):
+        with self.condition:
+            queued = sum(len(tasks) for tasks in self.jobs.values())
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "queued": queued,
+                "jobs": len(self.jobs),
+                "completed": self.completed,
+                "avg_wait": self.wait_total / self.completed if self.completed else 0.0,
+                "max_wait": self.wait_max,
+            }
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+class EngineGovernor:
+    """
+    Спільний для всіх сесій диспетчер запитів до рушіїв перекладу з
+    глобальними лімітами паралельності та справедливою чергою між задачами.
+    """
+
+    def __init__(self, limits=None):
+        self.queues = {
+            engine: _EngineQueue(engine, limit)
+            for engine, limit in (limits or DEFAULT_LIMITS).items()
+        }
+
+    def submit(self, engine, job_id, fn, *args, **kwargs):
+        """Ставить виклик fn у чергу рушія від імені задачі job_id; повертає Future."""
+        future = Future()
+        self.queues[engine].put(job_id, (future, fn, args, kwargs, time.monotonic()))
+        return future
+
+    def cancel_job(self, job_id):
+        """Скасовує всі завдання задачі, що ще чекають у чергах."""
+        cancelled = sum(queue.cancel_job(job_id) for queue in self.queues.values())
+        if cancelled:
+            logging.info(f"Скасовано завдань задачі {job_id}: {cancelled}")
+        return cancelled
+
+    def snapshot(self):
+        """Метрики черг: ліміт, активні й очікувані завдання, час очікування."""
+        return {engine: queue.snapshot() for engine, queue in self.queues.items()}
+
+    def shutdown(self):
+        for queue in self.queues.values():
+            queue.close()
+
+_governor = None
+_governor_lock = threading.Lock()
+
+def get_governor():
+    """Повертає єдиний на процес екземпляр EngineGovernor."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = EngineGovernor()
+        return _governor
@@ -0,0 +1,73 @@
+import re
+from collections import Counter
+
+# Підтримувані мови: код ISO 639-1 -> назва англійською (для запиту до OpenAI)
+LANGUAGES = {
+    "en": "English",
+    "de": "German",
+    "fr": "French",
+    "uk": "Ukrainian",
+}
+
+# Назви мов в інтерфейсі
+LANGUAGE_LABELS = {
+    "en": "Англійська",
+    "de": "Німецька",
+    "fr": "Французька",
+    "uk": "Українська",
+}
+
+SOURCE_LANGUAGES = ("en", "de", "fr")
+DEFAULT_SOURCE = "en"
+DEFAULT_TARGET = "uk"
+
+# Значення параметра мови оригіналу, за якого мова визначається автоматично
+AUTO = "auto"
+
+# Найчастотніші службові слова мов оригіналу. Юридичні тексти містять їх у
+# великій кількості, тому для визначення мови документа цього достатньо.
+STOPWORDS = {
+    "en": frozenset(
+        "the of and to in a is that for on by with as be this are or shall "
+        "which from at it not any such its an have has been where other".split()
+    ),
+    "de": frozenset(
+        "der die das und in zu den von mit des ist im für auf dem nicht eine "
+        "ein als sich oder werden wird bei sind einer durch nach gemäß".split()
+    ),
+    "fr": frozenset(
+        "le la les de des et en du un une est que pour dans par sur au qui "
+        "aux ne pas sont être ou cette ses il conformément doit".split()
+    ),
+}
+
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+# Скільки слів документа достатньо для визначення мови
+SAMPLE_WORDS = 2000
+
+def detect_language(paragraphs, default=DEFAULT_SOURCE):
+    """
+    Визначає мову оригіналу (en, de або fr) за частотою службових слів у
+    перших SAMPLE_WORDS словах документа. Якщо жодного службового слова не
+    знайдено, повертає default.
+    """
+    scores = Counter()
+    seen = 0
+    for paragraph in paragraphs:
+        for word in WORD_RE.findall(paragraph.lower()):
+            for language, stopwords in STOPWORDS.items():
+                if word in stopwords:
+                    scores[language] += 1
+            seen += 1
+        if seen >= SAMPLE_WORDS:
+            break
+    if not scores:
+        return default
+    return scores.most_common(1)[0][0]
+
+def resolve_source(source, paragraphs):
+    """Повертає мову оригіналу задачі; для AUTO визначає її за текстом."""
+    if source == AUTO:
+        return detect_language(paragraphs)
+    return source
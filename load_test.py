@@ -0,0 +1,234 @@
+"""
+Навантажувальне тестування конвеєра перекладу.
+
+Запускає N одночасних задач перекладу тим самим шляхом, що й
+process_translation в app.py (pipeline.run_translation_job через
+EngineGovernor + оцінка узгодженості), але з локальними замінниками рушіїв
+із заданими розподілами затримок і частотою помилок. Для кожного рівня
+паралельності виводить пропускну здатність, p50/p95/p99 тривалості задачі,
+кількість потоків, RSS та час очікування в чергах рушіїв.
+
+Приклад:
+    python load_test.py --levels 1,5,10,20 --paragraphs 100 \\
+        --latency google=0.3:0.5,marian=0.8:0.3,openai=1.5:0.6 --error-rate openai=0.02
+"""
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import resource
+import threading
+
+from governor import EngineGovernor, DEFAULT_LIMITS
+from pipeline import run_translation_job
+from agreement import score_agreement
+
+# Медіана затримки (с) і sigma логнормального розподілу за замовчуванням
+DEFAULT_LATENCY = {
+    "google": (0.3, 0.5),
+    "marian": (0.8, 0.3),
+    "openai": (1.5, 0.6),
+}
+
+SAMPLE_TEXT = (
+    "The Member State shall ensure that the controller implements appropriate technical "
+    "and organisational measures to ensure a level of security appropriate to the risk."
+)
+
+class StandInEngine:
+    """Локальний замінник рушія перекладу з випадковою затримкою та помилками."""
+
+    def __init__(self, name, median, sigma, error_rate, seed=None):
+        self.name = name
+        self.mu = math.log(median) if median > 0 else None
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def __call__(self, text):
+        with self.lock:
+            delay = self.random.lognormvariate(self.mu, self.sigma) if self.mu is not None else 0.0
+            failed = self.random.random() < self.error_rate
+        time.sleep(delay)
+        if failed:
+            return "Translation error"
+        return f"[{self.name}] {text}"
+
+def current_rss_mb():
+    """Поточний RSS процесу в МБ (пікове значення, якщо /proc недоступний)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def percentile(values, fraction):
+    """Перцентиль методом найближчого рангу."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+class ResourceSampler(threading.Thread):
+    """Періодично фіксує кількість потоків і RSS під час рівня навантаження."""
+
+    def __init__(self, interval=0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.max_threads = 0
+        self.max_rss = 0.0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.max_threads = max(self.max_threads, threading.active_count())
+            self.max_rss = max(self.max_rss, current_rss_mb())
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+def run_level(concurrency, paragraphs, engine_config, limits, seed):
+    """Виконує concurrency одночасних задач і повертає зведені метрики."""
+    governor = EngineGovernor(limits)
+    engines = {
+        name: StandInEngine(name, median, sigma, error_rate, seed=None if seed is None else seed + i)
+        for i, (name, (median, sigma, error_rate)) in enumerate(engine_config.items())
+    }
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def job():
+        started = time.perf_counter()
+        job_id = uuid.uuid4().hex
+        try:
+            store = run_translation_job(paragraphs, engines, governor, job_id)
+            store.set_agreement(score_agreement(store.source, {name: store.column(name) for name in store.engines}))
+        except Exception as e:
+            with lock:
+                failures.append(repr(e))
+            return
+        finally:
+            governor.cancel_job(job_id)
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    sampler = ResourceSampler()
+    sampler.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=job, name=f"job-{i}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - started
+    sampler.stop()
+
+    snapshot = governor.snapshot()
+    governor.shutdown()
+    engine_calls = len(latencies) * len(paragraphs) * len(engines)
+    return {
+        "concurrency": concurrency,
+        "jobs": len(latencies),
+        "failed_jobs": len(failures),
+        "wall_time": wall_time,
+        "jobs_per_min": len(latencies) / wall_time * 60 if wall_time else 0.0,
+        "engine_calls_per_s": engine_calls / wall_time if wall_time else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max_threads": sampler.max_threads,
+        "max_rss_mb": sampler.max_rss,
+        "queue_wait": {
+            engine: {"avg": metrics["avg_wait"], "max": metrics["max_wait"]}
+            for engine, metrics in snapshot.items()
+        },
+    }
+
+def _parse_mapping(value, cast):
+    """Розбирає рядок виду "google=0.3,openai=1.5" у словник."""
+    result = {}
+    if not value:
+        return result
+    for item in value.split(","):
+        name, _, raw = item.partition("=")
+        result[name.strip()] = cast(raw.strip())
+    return result
+
+def _parse_latency(raw):
+    median, _, sigma = raw.partition(":")
+    return float(median), float(sigma or 0.0)
+
+def load_paragraphs(args):
+    if args.input:
+        from docx_stream import iter_docx_paragraphs
+        paragraphs = list(iter_docx_paragraphs(args.input))
+        return paragraphs[:args.paragraphs] if args.paragraphs else paragraphs
+    return [f"{i + 1}. {SAMPLE_TEXT}" for i in range(args.paragraphs)]
+
+def print_report(results, engines):
+    header = f"{'N':>4} {'jobs':>5} {'fail':>5} {'wall,s':>8} {'jobs/min':>9} {'calls/s':>8} {'p50,s':>7} {'p95,s':>7} {'p99,s':>7} {'threads':>8} {'RSS,MB':>8}"
+    header += "".join(f" {engine + ' wait':>14}" for engine in engines)
+    print(header)
+    for r in results:
+        line = (
+            f"{r['concurrency']:>4} {r['jobs']:>5} {r['failed_jobs']:>5} {r['wall_time']:>8.2f} {r['jobs_per_min']:>9.1f} "
+            f"{r['engine_calls_per_s']:>8.1f} {r['p50']:>7.2f} {r['p95']:>7.2f} {r['p99']:>7.2f} {r['max_threads']:>8} {r['max_rss_mb']:>8.1f}"
+        )
+        line += "".join(
+            f" {r['queue_wait'][engine]['avg']:>6.2f}/{r['queue_wait'][engine]['max']:<7.2f}" for engine in engines
+        )
+        print(line)
+    print("Час очікування в черзі рушія: середній/максимальний, с.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Навантажувальне тестування конвеєра перекладу LegalTransUA.")
+    parser.add_argument("--levels", default="1,2,5,10,20", help="рівні паралельності через кому (кількість одночасних задач)")
+    parser.add_argument("--paragraphs", type=int, default=50, help="кількість абзаців у кожній задачі")
+    parser.add_argument("--input", help="DOCX-файл, абзаци якого використовуються замість синтетичного тексту")
+    parser.add_argument("--latency", default="", help="затримки рушіїв: engine=медіана[:sigma], через кому")
+    parser.add_argument("--error-rate", default="", help="частота помилок рушіїв: engine=частка, через кому")
+    parser.add_argument("--limits", default="", help="ліміти паралельності: engine=N, через кому (за замовчуванням як у governor)")
+    parser.add_argument("--seed", type=int, default=None, help="зерно генератора випадкових чисел")
+    parser.add_argument("--json", help="зберегти результати у JSON-файл")
+    args = parser.parse_args(argv)
+
+    latency = dict(DEFAULT_LATENCY)
+    latency.update(_parse_mapping(args.latency, _parse_latency))
+    error_rates = _parse_mapping(args.error_rate, float)
+    engine_config = {
+        name: (median, sigma, error_rates.get(name, 0.0))
+        for name, (median, sigma) in latency.items()
+    }
+    limits = {name: DEFAULT_LIMITS.get(name, 1) for name in engine_config}
+    limits.update(_parse_mapping(args.limits, int))
+
+    paragraphs = load_paragraphs(args)
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    print(f"Абзаців у задачі: {len(paragraphs)}; ліміти рушіїв: {limits}")
+
+    results = []
+    for concurrency in levels:
+        results.append(run_level(concurrency, paragraphs, engine_config, limits, args.seed))
+        print_report(results[-1:], list(engine_config))
+
+    print()
+    print_report(results, list(engine_config))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return results
+
+if __name__ == "__main__":
+    main()
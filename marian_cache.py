@@ -0,0 +1,122 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from transformers import MarianMTModel, MarianTokenizer
+
+# Моделі Helsinki-NLP для кожної мовної пари завантажуються на вимогу
+MODEL_TEMPLATE = "Helsinki-NLP/opus-mt-{source}-{target}"
+
+# Сумарний обсяг пам'яті завантажених моделей (налаштовується через .env).
+# Одна модель opus-mt займає близько 300 МБ.
+DEFAULT_BUDGET_BYTES = int(float(os.getenv("MARIAN_CACHE_MB", "1024")) * 1024 * 1024)
+
+# Через скільки секунд повторювати спробу завантажити модель після помилки
+# (до того запити цієї пари одразу отримують помилку, а не чекають)
+RETRY_AFTER_SECONDS = 300
+
+def model_size(model):
+    """Обсяг пам'яті параметрів і буферів моделі в байтах."""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+class MarianModelCache:
+    """
+    LRU-кеш моделей MarianMT з обмеженням сумарного обсягу пам'яті.
+
+    Моделі завантажуються під час першого запиту мовної пари. Якщо нова
+    модель не вміщується в бюджет, витісняються найдавніше використані;
+    остання завантажена модель залишається в кеші навіть понад бюджет.
+    Паралельні запити однієї пари чекають на одне завантаження.
+    """
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.models = OrderedDict()  # (source, target) -> (tokenizer, model, розмір)
+        self.failed = {}  # (source, target) -> (текст помилки, час)
+        self.loading = {}  # (source, target) -> threading.Lock
+        self.lock = threading.Lock()
+
+    def get(self, source, target):
+        """Повертає (tokenizer, model) для мовної пари, завантажуючи модель за потреби."""
+        pair = (source, target)
+        with self.lock:
+            cached = self._lookup(pair)
+            if cached is not None:
+                return cached
+            pair_lock = self.loading.setdefault(pair, threading.Lock())
+
+        with pair_lock:
+            # Поки потік чекав, модель міг завантажити інший потік
+            with self.lock:
+                cached = self._lookup(pair)
+            if cached is not None:
+                return cached
+            return self._load(pair)
+
+    def _lookup(self, pair):
+        """Повертає модель із кешу (або None); викликається під self.lock."""
+        if pair in self.models:
+            self.models.move_to_end(pair)
+            tokenizer, model, _ = self.models[pair]
+            return tokenizer, model
+        failure = self.failed.get(pair)
+        if failure is not None:
+            message, failed_at = failure
+            if time.monotonic() - failed_at < RETRY_AFTER_SECONDS:
+                raise RuntimeError(message)
+            del self.failed[pair]
+        return None
+
+    def _load(self, pair):
+        model_name = MODEL_TEMPLATE.format(source=pair[0], target=pair[1])
+        logging.info(f"Завантаження моделі MarianMT: {model_name}")
+        try:
+            tokenizer = MarianTokenizer.from_pretrained(model_name)
+            model = MarianMTModel.from_pretrained(model_name)
+        except Exception as e:
+            message = f"Модель {model_name} недоступна: {e}"
+            with self.lock:
+                self.failed[pair] = (message, time.monotonic())
+                self.loading.pop(pair, None)
+            raise RuntimeError(message) from e
+        size = model_size(model)
+
+        with self.lock:
+            self.models[pair] = (tokenizer, model, size)
+            self.loading.pop(pair, None)
+            self._evict(keep=pair)
+        logging.info(f"Модель {model_name} завантажено ({size / 1024 / 1024:.0f} МБ).")
+        return tokenizer, model
+
+    def _evict(self, keep):
+        total = sum(size for _, _, size in self.models.values())
+        for pair in list(self.models):
+            if total <= self.budget_bytes:
+                break
+            if pair == keep:
+                continue
+            total -= self.models.pop(pair)[2]
+            logging.info(f"Модель MarianMT {pair[0]}-{pair[1]} витіснено з кешу (перевищено бюджет пам'яті).")
+
+    def snapshot(self):
+        """Завантажені мовні пари (від найдавніше використаної) та зайнята пам'ять."""
+        with self.lock:
+            return {
+                "pairs": [f"{source}-{target}" for source, target in self.models],
+                "bytes": sum(size for _, _, size in self.models.values()),
+                "budget_bytes": self.budget_bytes,
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_marian_cache():
+    """Повертає єдиний на процес екземпляр MarianModelCache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MarianModelCache()
+        return _cache
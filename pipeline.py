@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import as_completed
+
+from result_store import ResultStore
+
+def timed_call(func, *args, **kwargs):
+    """Викликає рушій перекладу та повертає (результат, час у секундах)."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+def iter_translation_job(store, engines, governor, job_id):
+    """
+    Подає абзаци store усім рушіям через спільний диспетчер і повертає пари
+    (рушій, індекс абзацу) в міру надходження результатів, які вже записані
+    у store. Клітинки, заповнені заздалегідь (наприклад, перекладами з
+    попередньої версії документа), рушіям не надсилаються.
+
+    engines - словник {рушій: функція(text) -> переклад}. Завдання подаються
+    по абзацах (усі рушії для абзацу 1, потім для абзацу 2 і т.д.), щоб перші
+    рядки результатів з'являлися якнайшвидше.
+    """
+    futures = {}
+    for idx, para in enumerate(store.source):
+        for engine, translate in engines.items():
+            if store.done[engine][idx]:
+                continue
+            futures[governor.submit(engine, job_id, timed_call, translate, para)] = (engine, idx)
+
+    for future in as_completed(futures):
+        engine, idx = futures[future]
+        translation, elapsed = future.result()
+        store.set_result(engine, idx, translation or "Помилка перекладу", elapsed)
+        yield engine, idx
+
+def run_translation_job(paragraphs, engines, governor, job_id, on_result=None, source_lang="en", target_lang="uk", store=None):
+    """
+    Перекладає абзаци всіма рушіями через спільний диспетчер та повертає
+    заповнений ResultStore. on_result(store) викликається в потоці, що
+    викликав функцію, після кожного отриманого результату. Якщо передано
+    частково заповнений store, перекладаються лише його порожні клітинки.
+    """
+    if store is None:
+        store = ResultStore(paragraphs, engines=list(engines), source_lang=source_lang, target_lang=target_lang)
+    for _ in iter_translation_job(store, engines, governor, job_id):
+        if on_result is not None:
+            on_result(store)
+    return store
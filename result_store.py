@@ -0,0 +1,102 @@
+from array import array
+
+# Рушії перекладу та їхні назви у таблицях
+ENGINES = ("google", "marian", "openai")
+ENGINE_LABELS = {
+    "google": "Google Translate",
+    "marian": "MarianMT",
+    "openai": "OpenAI GPT",
+}
+
+# Стан абзацу відносно попередньої версії документа (versions.py)
+CHANGE_LABELS = {
+    "unchanged": "без змін",
+    "moved": "переміщено",
+    "modified": "змінено",
+    "inserted": "новий",
+}
+
+# Значення, якими рушії та інтерфейс позначають невдалий переклад
+ERROR_MARKERS = ("Translation error", "Помилка перекладу")
+
+def is_error(text):
+    """Перевіряє, чи є результат рушія помилкою."""
+    return not text or text in ERROR_MARKERS
+
+class ResultStore:
+    """
+    Стовпцеве сховище результатів перекладу: номер абзацу, оригінал,
+    окремий стовпець для кожного рушія, час перекладу та ознаки помилок.
+
+    Числові стовпці зберігаються в компактних масивах (array/bytearray),
+    тому навіть на великих актах накладні витрати на рядок мінімальні.
+    """
+
+    def __init__(self, paragraphs, engines=ENGINES, source_lang="en", target_lang="uk"):
+        size = len(paragraphs)
+        self.engines = tuple(engines)
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.ids = array("I", range(1, size + 1))
+        self.source = list(paragraphs)
+        self.translations = {engine: [""] * size for engine in self.engines}
+        self.timings = {engine: array("d", bytes(8 * size)) for engine in self.engines}
+        self.errors = {engine: bytearray(size) for engine in self.engines}
+        self.done = {engine: bytearray(size) for engine in self.engines}
+        self.completed = dict.fromkeys(self.engines, 0)
+        # Оцінки узгодженості рушіїв (agreement.score_agreement), якщо обчислені
+        self.agreement = None
+        self.risk = None
+        # Стан абзаців відносно попередньої версії документа, якщо позначається
+        self.changes = None
+
+    def __len__(self):
+        return len(self.source)
+
+    def set_result(self, engine, idx, text, elapsed=0.0):
+        """Записує результат рушія для абзацу з індексом idx."""
+        self.translations[engine][idx] = text
+        self.timings[engine][idx] = elapsed
+        self.errors[engine][idx] = is_error(text)
+        if not self.done[engine][idx]:
+            self.done[engine][idx] = 1
+            self.completed[engine] += 1
+
+    def column(self, engine):
+        """Повертає стовпець перекладів рушія."""
+        return self.translations[engine]
+
+    def progress(self, engine):
+        """Частка абзаців, перекладених рушієм."""
+        return self.completed[engine] / len(self) if len(self) else 1.0
+
+    def is_complete(self):
+        return all(count == len(self) for count in self.completed.values())
+
+    def all_empty(self):
+        """True, якщо жоден рушій не повернув жодного перекладу."""
+        return all(not text for engine in self.engines for text in self.translations[engine])
+
+    def set_agreement(self, report):
+        """Зберігає оцінки узгодженості рушіїв для кожного рядка."""
+        self.agreement = report["agreement"]
+        self.risk = report["risk"]
+
+    def set_changes(self, changes):
+        """Зберігає стан кожного абзацу відносно попередньої версії (ключі CHANGE_LABELS)."""
+        self.changes = list(changes)
+
+    def iter_rows(self):
+        """Послідовно повертає рядки у вигляді словників (без копіювання стовпців)."""
+        for idx in range(len(self)):
+            row = {"id": self.ids[idx], "source": self.source[idx]}
+            for engine in self.engines:
+                row[engine] = self.translations[engine][idx]
+                row[f"{engine}_seconds"] = round(self.timings[engine][idx], 3)
+                row[f"{engine}_error"] = bool(self.errors[engine][idx])
+            if self.agreement is not None:
+                row["agreement"] = round(float(self.agreement[idx]), 3)
+                row["risk"] = round(float(self.risk[idx]), 3)
+            if self.changes is not None:
+                row["change"] = self.changes[idx]
+            yield row
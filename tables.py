@@ -0,0 +1,57 @@
+import os
+import logging
+import subprocess
+
+from translate_script import create_translation_table_markdown, apply_styles_directly
+from agreement import RISK_THRESHOLD, METRIC_NAME
+from result_store import CHANGE_LABELS
+
+# Спільні для Streamlit-сторінки та HTTP API генератори таблиць перекладу
+
+def build_review_marks(store):
+    """Позначки для стовпця узгодженості: ⚠ для рядків, що потребують перевірки."""
+    if store.agreement is None:
+        return None
+    return [
+        f"{'⚠ ' if risk >= RISK_THRESHOLD else ''}{agreement:.2f}"
+        for agreement, risk in zip(store.agreement, store.risk)
+    ]
+
+def build_change_marks(store):
+    """Позначки змін відносно попередньої версії документа."""
+    if store.changes is None:
+        return None
+    return [CHANGE_LABELS[change] for change in store.changes]
+
+def build_markdown(store):
+    """Markdown-таблиця результатів; рушії, яких немає в store, позначаються «-»."""
+    empty = [""] * len(store)
+    columns = [store.translations.get(engine, empty) for engine in ("google", "marian", "openai")]
+    return create_translation_table_markdown(
+        store.source, *columns, build_review_marks(store), build_change_marks(store),
+        review_title=f"Agreement ({METRIC_NAME})",
+    )
+
+def export_markdown(store, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(build_markdown(store))
+    return path
+
+def export_docx(store, path):
+    """
+    Створює стилізовану DOCX-таблицю результатів (Markdown -> pandoc ->
+    apply_styles_directly). Повертає шлях до файлу або None у разі помилки.
+    """
+    markdown_file = os.path.splitext(path)[0] + ".md"
+    logging.info(f"Створення Markdown-файлу: {markdown_file}")
+    export_markdown(store, markdown_file)
+
+    try:
+        result = subprocess.run(["pandoc", "-f", "markdown", "-t", "docx", markdown_file, "-o", path])
+    except OSError as e:
+        logging.error(f"Не вдалося запустити pandoc: {e}")
+        return None
+    if result.returncode != 0:
+        logging.error("Помилка при конвертації Markdown в DOCX.")
+        return None
+    return apply_styles_directly(path)
@@ -0,0 +1,76 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from agreement import CHAR_ORDER, BETA, score_agreement
+
+def reference_chrf(first, second):
+    """Пряма реалізація chrF для перевірки векторизованої версії."""
+    first = "".join(first.split())
+    second = "".join(second.split())
+    precision_sum = recall_sum = 0.0
+    orders = 0
+    for order in range(1, CHAR_ORDER + 1):
+        first_grams = Counter(first[i:i + order] for i in range(len(first) - order + 1))
+        second_grams = Counter(second[i:i + order] for i in range(len(second) - order + 1))
+        if not first_grams or not second_grams:
+            continue
+        matches = sum((first_grams & second_grams).values())
+        precision_sum += matches / sum(first_grams.values())
+        recall_sum += matches / sum(second_grams.values())
+        orders += 1
+    if not orders:
+        return 0.0
+    precision, recall = precision_sum / orders, recall_sum / orders
+    if not precision + recall:
+        return 0.0
+    return (1 + BETA ** 2) * precision * recall / (BETA ** 2 * precision + recall)
+
+def reference_agreement(translations, row):
+    engines = list(translations)
+    return np.mean([
+        reference_chrf(translations[a][row], translations[b][row])
+        for i, a in enumerate(engines) for b in engines[i + 1:]
+    ])
+
+def test_agreement_matches_reference_chrf():
+    rng = random.Random(7)
+    words = ["договір", "сторона", "суд", "право", "стаття", "пункт", "закон", "the", "party", "law"]
+    sources = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 12))) for _ in range(300)]
+    translations = {
+        engine: [" ".join(rng.choice(words) for _ in range(rng.randint(1, 12))) for _ in sources]
+        for engine in ("google", "marian", "openai")
+    }
+    result = score_agreement(sources, translations)
+    for row in range(len(sources)):
+        assert result["agreement"][row] == pytest.approx(reference_agreement(translations, row), abs=1e-9)
+
+def test_hash_collisions_stay_negligible():
+    # Випадкові літери по 300 символів дають найбільше різних n-грам у рядку,
+    # тобто найгірший випадок для колізій 32-бітних ключів
+    rng = random.Random(11)
+    alphabet = "абвгдежзийклмнопрстуфхцчшщьюяabcdefghij "
+    random_text = lambda: "".join(rng.choice(alphabet) for _ in range(300))
+    sources = [random_text() for _ in range(300)]
+    translations = {engine: [random_text() for _ in sources] for engine in ("google", "marian", "openai")}
+    result = score_agreement(sources, translations)
+    errors = [abs(result["agreement"][row] - reference_agreement(translations, row)) for row in range(len(sources))]
+    assert max(errors) < 1e-3
+    assert np.mean(errors) < 1e-4
+
+def test_single_engine_has_no_agreement():
+    result = score_agreement(["a b", "c"], {"google": ["a b", "c"]})
+    assert result["agreement"].tolist() == [0.0, 0.0]
+    assert result["risk"].tolist() == [1.0, 1.0]
+
+def test_error_rows_are_risky():
+    result = score_agreement(
+        ["Contract", "Party"],
+        {"google": ["Договір", "Сторона"], "marian": ["Договір", "Translation error"]},
+    )
+    assert result["agreement"][0] == pytest.approx(1.0)
+    assert result["risk"][0] == pytest.approx(0.0)
+    assert result["has_error"].tolist() == [False, True]
+    assert result["risk"][1] == 1.0
@@ -0,0 +1,84 @@
+import zipfile
+
+import pytest
+from lxml import etree
+
+from docx_stream import W_NS, W_P, DOCUMENT_XML, iter_docx_paragraphs, paragraph_text, paragraph_text_nodes, translate_docx_in_place
+from result_store import is_error
+
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+W14_NS = "http://schemas.microsoft.com/office/word/2010/wordml"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+DOCUMENT = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="{W_NS}" xmlns:mc="{MC_NS}" xmlns:w14="{W14_NS}" xmlns:r="{R_NS}" mc:Ignorable="w14">
+<w:body>
+<w:p w14:paraId="00000001"><w:r><w:rPr><w:b/></w:rPr><w:t>Article </w:t></w:r><w:r><w:t>one.</w:t></w:r></w:p>
+<w:p><w:hyperlink r:id="rId5"><w:r><w:t>Directive</w:t></w:r></w:hyperlink><w:r><w:t xml:space="preserve"> applies here.</w:t></w:r></w:p>
+<w:p><w:r><w:t>Outer text.</w:t></w:r><w:r><w:pict><w:txbxContent><w:p><w:r><w:t>Box text.</w:t></w:r></w:p></w:txbxContent></w:pict></w:r></w:p>
+<w:p><w:r><w:t>Please fail here.</w:t></w:r></w:p>
+<w:sectPr/>
+</w:body>
+</w:document>""".encode("utf-8")
+
+OTHER_MEMBERS = {
+    "[Content_Types].xml": b'<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>',
+    "word/styles.xml": b'<?xml version="1.0"?><w:styles xmlns:w="' + W_NS.encode() + b'"/>',
+    "word/media/image1.png": bytes(range(256)),
+}
+
+def translate(text):
+    return "Translation error" if "fail" in text else f"UK[{text}]"
+
+@pytest.fixture
+def docx_pair(tmp_path):
+    source = tmp_path / "source.docx"
+    with zipfile.ZipFile(source, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", OTHER_MEMBERS["[Content_Types].xml"])
+        docx.writestr(DOCUMENT_XML, DOCUMENT)
+        for name in ("word/styles.xml", "word/media/image1.png"):
+            docx.writestr(name, OTHER_MEMBERS[name])
+    target = tmp_path / "target.docx"
+    stats = translate_docx_in_place(str(source), str(target), translate, max_workers=2, is_error=is_error)
+    return source, target, stats
+
+def read_document(path):
+    with zipfile.ZipFile(path) as docx:
+        return etree.fromstring(docx.read(DOCUMENT_XML))
+
+def own_texts(root):
+    return [paragraph_text(paragraph_text_nodes(paragraph)) for paragraph in root.iter(W_P)]
+
+def test_namespaces_and_ignorable_are_preserved(docx_pair):
+    _, target, _ = docx_pair
+    root = read_document(target)
+    assert root.nsmap == {"w": W_NS, "mc": MC_NS, "w14": W14_NS, "r": R_NS}
+    assert root.get(f"{{{MC_NS}}}Ignorable") == "w14"
+    assert root[0][0].get(f"{{{W14_NS}}}paraId") == "00000001"
+
+def test_paragraphs_translated_separately_and_errors_keep_source(docx_pair):
+    _, target, stats = docx_pair
+    assert own_texts(read_document(target)) == [
+        "UK[Article one.]",
+        "UK[Directive applies here.]",
+        "UK[Outer text.]",
+        "UK[Box text.]",
+        "Please fail here.",
+    ]
+    assert stats == {"paragraphs": 5, "translated": 4, "failed": 1}
+    assert list(iter_docx_paragraphs(str(target)))[3] == "UK[Box text.]"
+
+def test_translation_goes_to_direct_run_not_hyperlink(docx_pair):
+    _, target, _ = docx_pair
+    paragraph = list(read_document(target).iter(W_P))[1]
+    w = f"{{{W_NS}}}"
+    assert not paragraph.find(f"{w}hyperlink/{w}r/{w}t").text
+    assert paragraph.find(f"{w}r/{w}t").text == "UK[Directive applies here.]"
+
+def test_other_members_are_byte_identical(docx_pair):
+    source, target, _ = docx_pair
+    with zipfile.ZipFile(source) as src, zipfile.ZipFile(target) as dst:
+        assert dst.namelist() == src.namelist()
+        for name in OTHER_MEMBERS:
+            assert dst.read(name) == src.read(name)
+            assert dst.getinfo(name).compress_type == src.getinfo(name).compress_type
@@ -0,0 +1,22 @@
+from glossary import Glossary
+
+GLOSSARY = Glossary([("force majeure", "форс-мажор"), ("party", "сторона")])
+
+def test_protect_and_restore_round_trip():
+    text, protected = GLOSSARY.protect("Each party is released by force majeure.")
+    assert text == "Each [[T0]] is released by [[T1]]."
+    assert GLOSSARY.restore("Кожна [[T0]] звільняється через [[T1]].", protected) == "Кожна сторона звільняється через форс-мажор."
+
+def test_restore_accepts_spacing_and_cyrillic_t():
+    _, protected = GLOSSARY.protect("party and force majeure")
+    assert GLOSSARY.restore("[[ Т0 ]] і [[т 1]]", protected) == "сторона і форс-мажор"
+
+def test_restore_rejects_lost_or_extra_placeholders():
+    _, protected = GLOSSARY.protect("party and force majeure")
+    assert GLOSSARY.restore("сторона і [[T1]]", protected) is None
+    assert GLOSSARY.restore("[[T0]], [[T0]] і [[T1]]", protected) is None
+    assert GLOSSARY.restore("[[T0]] і [[T1]] [[T2]]", protected) is None
+    assert GLOSSARY.restore("", protected) is None
+
+def test_restore_without_protected_terms_keeps_text():
+    assert GLOSSARY.restore("Текст [[T0]]", []) == "Текст [[T0]]"
@@ -0,0 +1,53 @@
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from governor import EngineGovernor
+from pipeline import iter_translation_job
+from result_store import ResultStore
+
+def test_cancel_queued_job_wakes_consumer():
+    """Скасування задачі, всі завдання якої ще в черзі, не повинно залишати споживача заблокованим."""
+    governor = EngineGovernor({"google": 1})
+    release = threading.Event()
+    busy = governor.submit("google", "other", release.wait, 5)
+    store = ResultStore(["a", "b", "c"], engines=["google"])
+    outcome = []
+
+    def consume():
+        try:
+            list(iter_translation_job(store, {"google": lambda text: text}, governor, "victim"))
+        except CancelledError:
+            outcome.append("cancelled")
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    try:
+        # Завдання "victim" стоять у черзі за зайнятим робочим потоком
+        while governor.snapshot()["google"]["queued"] < 3:
+            threading.Event().wait(0.01)
+        assert governor.cancel_job("victim") == 3
+        consumer.join(timeout=2)
+        assert not consumer.is_alive()
+        assert outcome == ["cancelled"]
+    finally:
+        release.set()
+        busy.result(timeout=5)
+        governor.shutdown()
+
+def test_cancelled_futures_are_done():
+    governor = EngineGovernor({"google": 1})
+    release = threading.Event()
+    busy = governor.submit("google", "other", release.wait, 5)
+    try:
+        queued = [governor.submit("google", "victim", str, i) for i in range(2)]
+        governor.cancel_job("victim")
+        for future in queued:
+            assert future.done()
+            with pytest.raises(CancelledError):
+                future.result(timeout=0)
+    finally:
+        release.set()
+        busy.result(timeout=5)
+        governor.shutdown()
@@ -0,0 +1,46 @@
+import io
+import os
+import time
+
+import upload_store
+from upload_store import cached_extract, enforce_file_quota, store_upload
+
+def write_file(path, size, age):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return str(path)
+
+def test_quota_evicts_least_recently_used(tmp_path):
+    old = write_file(tmp_path / "old.pdf", 100, age=300)
+    recent = write_file(tmp_path / "recent.pdf", 100, age=100)
+    keep = write_file(tmp_path / "keep.pdf", 100, age=500)
+    enforce_file_quota(str(tmp_path), quota_bytes=250, ttl_seconds=3600, keep=keep)
+    assert not os.path.exists(old)
+    assert os.path.exists(recent)
+    assert os.path.exists(keep)
+
+def test_ttl_and_stale_part_files(tmp_path):
+    expired = write_file(tmp_path / "expired.docx", 10, age=7200)
+    stale_part = write_file(tmp_path / "upload.part", 10, age=upload_store.PART_GRACE_SECONDS + 60)
+    fresh_part = write_file(tmp_path / "writing.part", 10, age=5)
+    enforce_file_quota(str(tmp_path), quota_bytes=10 ** 6, ttl_seconds=3600)
+    assert not os.path.exists(expired)
+    assert not os.path.exists(stale_part)
+    assert os.path.exists(fresh_part)
+
+def test_store_upload_applies_quota(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_store, "UPLOAD_QUOTA_BYTES", 15)
+    first, _ = store_upload(io.BytesIO(b"first file"), str(tmp_path), name="a.pdf")
+    os.utime(first, (time.time() - 60, time.time() - 60))
+    second, _ = store_upload(io.BytesIO(b"second file"), str(tmp_path), name="b.pdf")
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
+
+def test_extract_cache_hit_refreshes_last_use(tmp_path):
+    cached_extract("doc.pdf", "d" * 64, lambda path: ["абзац"], 1, cache_dir=str(tmp_path))
+    cache_file = tmp_path / f"{'d' * 64}-v1.json"
+    os.utime(cache_file, (time.time() - 600, time.time() - 600))
+    assert cached_extract("doc.pdf", "d" * 64, lambda path: [], 1, cache_dir=str(tmp_path)) == ["абзац"]
+    assert time.time() - os.path.getmtime(cache_file) < 60
@@ -0,0 +1,93 @@
+import os
+import time
+from concurrent.futures import Future
+
+import versions
+from versions import load_version, save_version, version_path
+from pipeline import run_translation_job
+from result_store import ResultStore
+
+def test_save_version_applies_quota(tmp_path, monkeypatch):
+    monkeypatch.setattr(versions, "VERSION_QUOTA_BYTES", 1)
+    old_path = version_path("old.docx", "en", "uk", version_dir=str(tmp_path))
+    save_version(ResultStore(["a"], engines=["google"]), old_path)
+    os.utime(old_path, (time.time() - 60, time.time() - 60))
+
+    new_path = version_path("new.docx", "en", "uk", version_dir=str(tmp_path))
+    save_version(ResultStore(["b"], engines=["google"]), new_path)
+    assert not os.path.exists(old_path)
+    assert load_version(new_path)[0]["source"] == "b"
+
+def rows_for(paragraphs, translations):
+    """Рядки попередньої версії у форматі ResultStore.iter_rows."""
+    store = ResultStore(paragraphs, engines=list(translations))
+    for engine, column in translations.items():
+        for idx, text in enumerate(column):
+            store.set_result(engine, idx, text)
+    return list(store.iter_rows())
+
+class RecordingGovernor:
+    """Диспетчер, що виконує завдання одразу та запам'ятовує їх."""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, engine, job_id, fn, *args, **kwargs):
+        self.calls.append((engine, args[-1]))
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+def test_align_versions_counts_changes():
+    old = ["A", "B", "C", "D", "E", "F"]
+    new = ["A", "B amended", "C", "X", "E", "D"]
+    matches, changes, removed = versions.align_versions(old, new)
+    assert changes == ["unchanged", "modified", "unchanged", "inserted", "moved", "unchanged"]
+    assert matches == [0, None, 2, None, 4, 3]
+    # E переміщено, а не видалено; зникло лише F
+    assert removed == 1
+
+def test_align_versions_ignores_whitespace_changes():
+    matches, changes, removed = versions.align_versions(["Стаття  1.", "Стаття 2."], [" Стаття 1.", "Стаття 2.\n"])
+    assert changes == ["unchanged", "unchanged"]
+    assert removed == 0
+
+def test_prefill_reuses_translations_and_retries_errors():
+    previous = rows_for(["A", "B", "C"], {
+        "google": ["а", "Translation error", "в"],
+        "marian": ["а*", "б*", "в*"],
+    })
+    store = ResultStore(["A", "B", "C amended", "D"], engines=["google", "marian"])
+    stats = versions.prefill_from_version(store, previous, mark_changes=True)
+
+    assert store.translations["google"][:2] == ["а", ""]
+    assert store.translations["marian"][:2] == ["а*", "б*"]
+    assert stats["unchanged"] == 2 and stats["modified"] == 1 and stats["inserted"] == 1
+    assert stats["reused"] == 3
+    assert stats["to_translate"] == 5
+    assert store.changes == ["unchanged", "unchanged", "modified", "inserted"]
+
+def test_prefill_with_engines_missing_from_previous_version():
+    previous = rows_for(["A", "B"], {"google": ["а", "б"]})
+    store = ResultStore(["A", "B"], engines=["google", "openai"])
+    stats = versions.prefill_from_version(store, previous)
+
+    assert store.translations["google"] == ["а", "б"]
+    assert list(store.done["openai"]) == [0, 0]
+    assert stats["reused"] == 2
+    assert stats["to_translate"] == 2
+
+def test_run_translation_job_submits_only_empty_cells():
+    previous = rows_for(["A", "B"], {"google": ["а", "Translation error"], "marian": ["а*", "б*"]})
+    store = ResultStore(["A", "B", "C"], engines=["google", "marian"])
+    versions.prefill_from_version(store, previous)
+    governor = RecordingGovernor()
+    engines = {"google": lambda text: f"g:{text}", "marian": lambda text: f"m:{text}"}
+
+    result = run_translation_job(store.source, engines, governor, "job", store=store)
+
+    assert result is store
+    assert sorted(governor.calls) == [("google", "B"), ("google", "C"), ("marian", "C")]
+    assert store.translations["google"] == ["а", "g:B", "g:C"]
+    assert store.translations["marian"] == ["а*", "б*", "m:C"]
+    assert store.is_complete()
@@ -4,7 +4,6 @@ import zipfile
 import xml.etree.ElementTree as ET
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from transformers import MarianMTModel, MarianTokenizer
 from deep_translator import GoogleTranslator
 import openai
 import requests
@@ -14,8 +13,12 @@ import re
 import time
 from datetime import datetime
 import shutil
+import tempfile
 from lxml import etree
 import subprocess
+from docx_stream import iter_docx_paragraphs
+from marian_cache import get_marian_cache
+from language import LANGUAGES, DEFAULT_SOURCE, DEFAULT_TARGET
 
 # Ваші інші імпорти і змінні тут
 
@@ -26,6 +29,7 @@ __all__ = [
     "translate_text_google",
     "translate_text_marian",
     "translate_text_openai",
+    "get_engine_functions",
     "create_translation_table_markdown",
     "generate_docx",
     "apply_styles_to_docx",  # Додайте сюди цю функцію
@@ -42,10 +46,19 @@ if not openai_api_key:
     exit(1)
 openai.api_key = openai_api_key
 
-# Ініціалізація MarianMT
-model_name = "Helsinki-NLP/opus-mt-en-uk"
-tokenizer = MarianTokenizer.from_pretrained(model_name)
-model = MarianMTModel.from_pretrained(model_name)
+# Спільний пул HTTP-з'єднань процесу: його використовують запити до OpenAI та
+# завантаження веб-сторінок, тому з'єднання перевикористовуються між запитами
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+http_session = requests.Session()
+_http_adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+http_session.mount("https://", _http_adapter)
+http_session.mount("http://", _http_adapter)
+openai.requestssession = http_session
+
+# Моделі MarianMT завантажуються на вимогу для кожної мовної пари у спільний
+# кеш з обмеженням пам'яті; модель основної пари завантажується одразу
+marian_cache = get_marian_cache()
+marian_cache.get(DEFAULT_SOURCE, DEFAULT_TARGET)
 
 ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
 
@@ -64,15 +77,13 @@ def sanitize_filename(filename):
 
 # -------------------- Екстракція тексту --------------------
 
+# Версія логіки екстракції. Збільшуйте при будь-якій зміні екстракторів,
+# щоб кешовані списки абзаців (upload_store.cached_extract) стали недійсними.
+EXTRACTOR_VERSION = 2
+
 def extract_text_from_docx(file_path):
-    """Витягує текст із DOCX-файлу."""
-    with zipfile.ZipFile(file_path, 'r') as docx:
-        xml_content = docx.read('word/document.xml')
-        tree = ET.ElementTree(ET.fromstring(xml_content))
-        root = tree.getroot()
-        namespaces = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-        paragraphs = [node.text for node in root.findall('.//w:t', namespaces)]
-    return paragraphs
+    """Витягує текст із DOCX-файлу (по одному рядку на абзац w:p)."""
+    return list(iter_docx_paragraphs(file_path))
 
 def extract_text_from_pdf(file_path):
     """Витягує текст із PDF-файлу."""
@@ -84,7 +95,7 @@ def extract_text_from_pdf(file_path):
 
 def extract_text_from_url(url):
     """Витягує текст із веб-сторінки."""
-    response = requests.get(url)
+    response = http_session.get(url)
     if response.status_code != 200:
         raise Exception(f"Не вдалося завантажити сторінку: {url}")
     soup = BeautifulSoup(response.content, "html.parser")
@@ -110,38 +121,108 @@ def extract_text(source):
 
 # -------------------- Переклад тексту --------------------
 
-def translate_text_google(text):
+def _protect_terms(text, glossary):
+    """Замінює терміни глосарію заповнювачами (якщо глосарій задано)."""
+    if glossary is None:
+        return text, []
+    return glossary.protect(text)
+
+def _restore_terms(translation, protected, glossary):
+    """
+    Підставляє обов'язкові переклади термінів у результат рушія. Якщо рушій
+    пошкодив заповнювачі, повертає "Translation error", щоб переклад без
+    обов'язкових термінів не потрапив у таблицю як коректний.
+    """
+    if glossary is None or not protected or translation == "Translation error":
+        return translation
+    restored = glossary.restore(translation, protected)
+    if restored is None:
+        logging.warning(f"Рушій пошкодив заповнювачі термінів ({len(protected)} очікувалося): {translation}")
+        return "Translation error"
+    return restored
+
+def translate_text_google(text, glossary=None, source=DEFAULT_SOURCE, target=DEFAULT_TARGET):
+    text, protected = _protect_terms(text, glossary)
     try:
-        return GoogleTranslator(source='en', target='uk').translate(text)
+        translation = GoogleTranslator(source=source, target=target).translate(text)
     except Exception as e:
         logging.error(f"Google Translate Error: {e}")
         return "Translation error"
+    return _restore_terms(translation, protected, glossary)
 
-def translate_text_marian(text, tokenizer, model):
+def translate_text_marian(text, tokenizer, model, glossary=None):
+    text, protected = _protect_terms(text, glossary)
     try:
         inputs = tokenizer([text], return_tensors="pt", padding=True, truncation=True)
         translated = model.generate(**inputs)
-        return tokenizer.batch_decode(translated, skip_special_tokens=True)[0]
+        translation = tokenizer.batch_decode(translated, skip_special_tokens=True)[0]
     except Exception as e:
         logging.warning(f"MarianMT Error: {e}")
         return "Translation error"
+    return _restore_terms(translation, protected, glossary)
+
+def translate_text_marian_pair(text, source=DEFAULT_SOURCE, target=DEFAULT_TARGET, glossary=None):
+    """Перекладає моделлю MarianMT мовної пари з кешу моделей."""
+    try:
+        tokenizer, model = marian_cache.get(source, target)
+    except RuntimeError as e:
+        logging.warning(f"MarianMT Error: {e}")
+        return "Translation error"
+    return translate_text_marian(text, tokenizer, model, glossary=glossary)
 
-def translate_text_openai(text, max_retries=3):
+def translate_text_openai(text, max_retries=3, glossary=None, source=DEFAULT_SOURCE, target=DEFAULT_TARGET):
+    text, protected = _protect_terms(text, glossary)
+    system_prompt = f"Translate the following {LANGUAGES[source]} text to {LANGUAGES[target]}."
+    if protected:
+        system_prompt += " Keep placeholders like [[T0]] unchanged."
     for attempt in range(max_retries):
         try:
             response = openai.ChatCompletion.create(
                 model="gpt-3.5-turbo",
                 messages=[
-                    {"role": "system", "content": "Translate the following text to Ukrainian."},
+                    {"role": "system", "content": system_prompt},
                     {"role": "user", "content": text},
                 ],
             )
-            return response.choices[0].message["content"].strip()
+            translation = _restore_terms(response.choices[0].message["content"].strip(), protected, glossary)
+            # Пошкоджені заповнювачі - привід повторити запит, як і помилка API
+            if translation != "Translation error":
+                return translation
         except Exception as e:
             logging.warning(f"OpenAI Error (attempt {attempt + 1}/{max_retries}): {e}")
             time.sleep(2 ** attempt + 1)
     return "Translation error"
 
+def preload_models(engines, source=DEFAULT_SOURCE, target=DEFAULT_TARGET):
+    """
+    Завантажує модель MarianMT мовної пари в потоці задачі, до постановки
+    завдань у чергу диспетчера. Інакше завантаження (~300 МБ) виконувалося б
+    у робочому потоці рушія "marian" і блокувало б переклади всіх сесій.
+    Помилка завантаження запам'ятовується кешем, тож завдання в черзі
+    одразу отримають "Translation error".
+    """
+    if "marian" not in engines:
+        return
+    try:
+        marian_cache.get(source, target)
+    except RuntimeError as e:
+        logging.warning(f"MarianMT Error: {e}")
+
+def get_engine_functions(glossary=None, source=DEFAULT_SOURCE, target=DEFAULT_TARGET):
+    """
+    Повертає словник {рушій: функція(text) -> переклад} для спільного
+    диспетчера. Моделі MarianMT беруться зі спільного кешу процесу.
+    Глосарій містить англійські терміни з українськими відповідниками,
+    тому застосовується лише до перекладу з англійської на українську.
+    """
+    if (source, target) != ("en", "uk"):
+        glossary = None
+    return {
+        "google": lambda text: translate_text_google(text, glossary=glossary, source=source, target=target),
+        "marian": lambda text: translate_text_marian_pair(text, source, target, glossary=glossary),
+        "openai": lambda text: translate_text_openai(text, glossary=glossary, source=source, target=target),
+    }
+
 def get_default_content_types():
     """Повертає стандартний XML для [Content_Types].xml."""
     return """<?xml version="1.0" encoding="UTF-8"?>
@@ -267,19 +348,23 @@ def create_translation_table(root, paragraphs, google_translations, marian_trans
             text_element = ET.SubElement(cell, "w:t")
             text_element.text = sanitize_text_for_xml(text)
 
-def create_translation_table_markdown(paragraphs, google_translations, marian_translations, openai_translations):
+def create_translation_table_markdown(paragraphs, google_translations, marian_translations, openai_translations, review_marks=None, change_marks=None, review_title="Agreement"):
     """
     Створює таблицю у форматі Markdown з оригінальним текстом та перекладами.
+    Якщо задано review_marks, додається стовпець узгодженості рушіїв із
+    заголовком review_title, а якщо change_marks - стовпець змін відносно
+    попередньої версії документа.
     """
     header = (
         "# Automated Document Translation\n\n"
         "Generated using the **LegalTransUA** script.\n"
         f"Date and time of translation: **{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}**.\n\n"
     )
-    table_header = "| No | Original Text | Google Translate | MarianMT | OpenAI GPT |\n"
-    table_divider = "|:---|:------------------|:----------------|:---------|:----------|\n"
+    extra_columns = [(title, marks) for title, marks in ((review_title, review_marks), ("Change", change_marks)) if marks is not None]
+    table_header = "| No | Original Text | Google Translate | MarianMT | OpenAI GPT |" + "".join(f" {title} |" for title, _ in extra_columns) + "\n"
+    table_divider = "|:---|:------------------|:----------------|:---------|:----------|" + ":----------|" * len(extra_columns) + "\n"
     rows = [
-        f"| {i+1} | {para} | {google or '-'} | {marian or '-'} | {openai or '-'} |"
+        f"| {i+1} | {para} | {google or '-'} | {marian or '-'} | {openai or '-'} |" + "".join(f" {marks[i]} |" for _, marks in extra_columns)
         for i, (para, google, marian, openai) in enumerate(zip(paragraphs, google_translations, marian_translations, openai_translations))
     ]
     return header + table_header + table_divider + "\n".join(rows)
@@ -601,10 +686,10 @@ def apply_styles_to_docx(docx_file):
         logging.error(f"Помилка при застосуванні стилів: {e}")
 
 def apply_styles_directly(docx_path):
+    # Окремий тимчасовий каталог для кожного виклику, щоб паралельні сесії
+    # не розпаковували документи в одне місце
+    temp_dir = tempfile.mkdtemp(prefix="temp_docx_")
     try:
-        # Створення тимчасового каталогу для роботи з файлами
-        temp_dir = "temp_docx"
-        shutil.rmtree(temp_dir, ignore_errors=True)
         with zipfile.ZipFile(docx_path, 'r') as zip_ref:
             zip_ref.extractall(temp_dir)
 
@@ -742,14 +827,14 @@ def apply_styles_directly(docx_path):
                     arcname = os.path.relpath(filepath, temp_dir)
                     zip_ref.write(filepath, arcname)
 
-        # Очищення тимчасових файлів
-        shutil.rmtree(temp_dir)
-
         logging.info(f"Файл успішно збережено: {updated_docx_path}")
         return updated_docx_path
     except Exception as e:
         logging.error(f"Помилка при зміні стилів: {e}")
         return None
+    finally:
+        # Очищення тимчасових файлів
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
 
 data = [
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+
+# Завантажені файли зберігаються під іменем, що є SHA-256 їхнього вмісту,
+# тому однакові файли різних користувачів не дублюються і не перезаписують
+# один одного.
+UPLOAD_DIR = os.path.join("temp", "uploads")
+
+# Кеш витягнутих абзаців: <хеш>-v<версія екстрактора>.json
+EXTRACT_CACHE_DIR = os.path.join("cache", "extract")
+
+# Ліміти розміру та час життя сховища завантажень і кешу екстракції
+# (налаштовуються через .env). Час останнього використання файлу - його mtime.
+UPLOAD_QUOTA_BYTES = int(float(os.getenv("UPLOAD_QUOTA_MB", "500")) * 1024 * 1024)
+UPLOAD_TTL_SECONDS = float(os.getenv("UPLOAD_TTL_HOURS", "24")) * 3600
+EXTRACT_CACHE_QUOTA_BYTES = int(float(os.getenv("EXTRACT_CACHE_QUOTA_MB", "100")) * 1024 * 1024)
+EXTRACT_CACHE_TTL_SECONDS = float(os.getenv("EXTRACT_CACHE_TTL_HOURS", "168")) * 3600
+
+# Тимчасові .part-файли молодші за цей час можуть ще записуватися іншою сесією
+PART_GRACE_SECONDS = 3600
+
+CHUNK_SIZE = 1024 * 1024
+
+def _touch(file_path):
+    """Оновлює час останнього використання файлу."""
+    try:
+        os.utime(file_path)
+    except OSError:
+        pass
+
+def _remove(file_path, reason):
+    try:
+        os.remove(file_path)
+    except OSError:
+        return
+    logging.info(f"Файл {file_path} видалено ({reason}).")
+
+def enforce_file_quota(directory, quota_bytes, ttl_seconds, keep=None):
+    """
+    Видаляє з каталогу файли, старші за TTL, а потім найдавніше використані
+    (LRU), доки сумарний розмір не стане меншим за квоту. Файл keep (щойно
+    записаний або прочитаний) не видаляється.
+    """
+    now = time.time()
+    files = []
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if not entry.is_file() or entry.path == keep:
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        age = now - stat.st_mtime
+        if entry.name.endswith(".part"):
+            if age > PART_GRACE_SECONDS:
+                _remove(entry.path, "незавершений запис")
+            continue
+        if age > ttl_seconds:
+            _remove(entry.path, "минув TTL")
+            continue
+        files.append((stat.st_mtime, entry.path, stat.st_size))
+
+    total = sum(size for _, _, size in files)
+    if keep is not None:
+        try:
+            total += os.path.getsize(keep)
+        except OSError:
+            pass
+    for last_used, file_path, size in sorted(files):
+        if total <= quota_bytes:
+            break
+        _remove(file_path, "перевищено квоту")
+        total -= size
+
+def _iter_chunks(file_obj):
+    file_obj.seek(0)
+    while True:
+        chunk = file_obj.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+def hash_file_obj(file_obj):
+    """Обчислює SHA-256 файлового об'єкта, читаючи його частинами."""
+    digest = hashlib.sha256()
+    for chunk in _iter_chunks(file_obj):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def store_upload(uploaded_file, upload_dir=UPLOAD_DIR, name=None):
+    """
+    Зберігає завантажений файл у сховище з адресацією за вмістом.
+    Повертає (шлях до файлу, хеш вмісту). Якщо такий файл уже є,
+    повторний запис не виконується. name - ім'я файлу, якщо файловий
+    об'єкт не має атрибута name (наприклад, завантаження через HTTP API).
+    """
+    name = name or uploaded_file.name
+    ext = os.path.splitext(name)[1].lower()
+    digest = hash_file_obj(uploaded_file)
+    file_path = os.path.join(upload_dir, f"{digest}{ext}")
+
+    if os.path.exists(file_path):
+        logging.info(f"Файл '{name}' уже є у сховищі: {file_path}")
+        _touch(file_path)
+        return file_path, digest
+
+    os.makedirs(upload_dir, exist_ok=True)
+    # Запис у тимчасовий файл з подальшим атомарним перейменуванням, щоб
+    # паралельні сесії ніколи не бачили частково записаний файл
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in _iter_chunks(uploaded_file):
+                f.write(chunk)
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logging.info(f"Файл '{name}' збережено: {file_path}")
+    enforce_file_quota(upload_dir, UPLOAD_QUOTA_BYTES, UPLOAD_TTL_SECONDS, keep=file_path)
+    return file_path, digest
+
+def find_upload(digest, upload_dir=UPLOAD_DIR):
+    """Повертає шлях до збереженого файлу за хешем вмісту або None."""
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        return None
+    try:
+        for entry in os.scandir(upload_dir):
+            if entry.is_file() and entry.name.startswith(digest) and not entry.name.endswith(".part"):
+                _touch(entry.path)
+                return entry.path
+    except FileNotFoundError:
+        pass
+    return None
+
+def cached_extract(file_path, digest, extractor, version, cache_dir=EXTRACT_CACHE_DIR):
+    """
+    Повертає абзаци документа з кешу за ключем (хеш вмісту, версія
+    екстрактора); за відсутності запису викликає extractor і кешує результат.
+    """
+    cache_file = os.path.join(cache_dir, f"{digest}-v{version}.json")
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                paragraphs = json.load(f)
+            logging.info(f"Абзаци взято з кешу: {cache_file}")
+            _touch(cache_file)
+            return paragraphs
+        except Exception as e:
+            logging.warning(f"Не вдалося прочитати кеш екстракції {cache_file}: {e}")
+
+    paragraphs = extractor(file_path)
+    # Порожній результат означає помилку екстракції - його не кешуємо
+    if paragraphs:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".part")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(paragraphs, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_file)
+        except Exception as e:
+            logging.warning(f"Не вдалося зберегти кеш екстракції: {e}")
+        enforce_file_quota(cache_dir, EXTRACT_CACHE_QUOTA_BYTES, EXTRACT_CACHE_TTL_SECONDS, keep=cache_file)
+    return paragraphs
@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import difflib
+import hashlib
+import logging
+import tempfile
+
+from exporters import export_jsonl
+from result_store import CHANGE_LABELS, is_error
+from upload_store import enforce_file_quota
+
+# Останній перекладений варіант кожного документа: один JSONL-файл на
+# документ, мовну пару та глосарій (рядки у форматі ResultStore.iter_rows)
+VERSION_DIR = os.path.join("cache", "versions")
+
+# Ліміт розміру та час життя збережених версій (налаштовуються через .env).
+# Нові редакції документів надходять рідше, ніж завантаження, тому TTL довший.
+VERSION_QUOTA_BYTES = int(float(os.getenv("VERSION_QUOTA_MB", "200")) * 1024 * 1024)
+VERSION_TTL_SECONDS = float(os.getenv("VERSION_TTL_HOURS", "720")) * 3600
+
+WHITESPACE = re.compile(r"\s+")
+
+def fingerprint(text):
+    """Відбиток абзацу: хеш тексту з нормалізованими пробілами."""
+    normalized = WHITESPACE.sub(" ", text or "").strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+def version_path(name, source_lang, target_lang, glossary=None, version_dir=VERSION_DIR):
+    """
+    Шлях до збереженої версії документа name. Переклади, зроблені з іншим
+    глосарієм або для іншої мовної пари, не перевикористовуються.
+    """
+    glossary_tag = glossary.digest[:12] if glossary is not None and glossary.digest else "none"
+    key = f"{name}\0{source_lang}-{target_lang}\0{glossary_tag}"
+    readable = re.sub(r"[^\w.-]+", "_", name)[:60]
+    return os.path.join(version_dir, f"{readable}.{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}.jsonl")
+
+def load_version(path):
+    """Повертає рядки збереженої версії або None, якщо її немає чи її не вдалося прочитати."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        # Версія, з якою щойно порівнювали, не повинна першою потрапити під витіснення
+        os.utime(path)
+        return rows
+    except Exception as e:
+        logging.warning(f"Не вдалося прочитати попередню версію {path}: {e}")
+        return None
+
+def save_version(store, path):
+    """Зберігає результати як останню версію документа (атомарно)."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    os.close(fd)
+    try:
+        export_jsonl(store, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.warning(f"Не вдалося зберегти версію документа {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    enforce_file_quota(directory, VERSION_QUOTA_BYTES, VERSION_TTL_SECONDS, keep=path)
+
+def align_versions(old_sources, new_sources):
+    """
+    Зіставляє абзаци нової версії з попередньою за відбитками.
+
+    Повертає (matches, changes, removed): matches[i] - індекс абзацу
+    попередньої версії з тим самим текстом або None; changes[i] - ключ
+    CHANGE_LABELS; removed - кількість абзаців, яких немає в новій версії.
+    Абзаци з тим самим текстом в іншому місці документа вважаються
+    переміщеними і теж перевикористовуються.
+    """
+    old_prints = [fingerprint(text) for text in old_sources]
+    new_prints = [fingerprint(text) for text in new_sources]
+    matches = [None] * len(new_prints)
+    changes = ["inserted"] * len(new_prints)
+    # Абзаци попередньої версії, що лишилися в новій (без змін, зміненими або
+    # переміщеними); решта вважаються видаленими
+    kept = set()
+
+    matcher = difflib.SequenceMatcher(None, old_prints, new_prints, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(j2 - j1):
+                matches[j1 + offset] = i1 + offset
+                changes[j1 + offset] = "unchanged"
+            kept.update(range(i1, i2))
+        elif tag == "replace":
+            # Блок змінених абзаців: перші з них вважаються редакцією старих,
+            # надлишок - новими абзацами або видаленими старими
+            edited = min(i2 - i1, j2 - j1)
+            changes[j1:j1 + edited] = ["modified"] * edited
+            kept.update(range(i1, i1 + edited))
+
+    first_index = {}
+    for idx, value in enumerate(old_prints):
+        first_index.setdefault(value, idx)
+    for idx, value in enumerate(new_prints):
+        if matches[idx] is None and value in first_index:
+            matches[idx] = first_index[value]
+            changes[idx] = "moved"
+            kept.add(matches[idx])
+    return matches, changes, len(old_prints) - len(kept)
+
+def prefill_from_version(store, previous_rows, mark_changes=False):
+    """
+    Заповнює store перекладами абзаців, текст яких не змінився відносно
+    попередньої версії, тому рушіям надсилаються лише нові та змінені
+    абзаци (а також ті, що попереднього разу завершилися помилкою).
+    Повертає статистику порівняння версій.
+    """
+    matches, changes, removed = align_versions([row["source"] for row in previous_rows], store.source)
+    reused = 0
+    for idx, old_idx in enumerate(matches):
+        if old_idx is None:
+            continue
+        row = previous_rows[old_idx]
+        for engine in store.engines:
+            text = row.get(engine)
+            if not is_error(text) and not row.get(f"{engine}_error"):
+                store.set_result(engine, idx, text)
+                reused += 1
+    if mark_changes:
+        store.set_changes(changes)
+
+    stats = dict.fromkeys(CHANGE_LABELS, 0)
+    for change in changes:
+        stats[change] += 1
+    stats["removed"] = removed
+    stats["reused"] = reused
+    stats["to_translate"] = len(store) * len(store.engines) - reused
+    logging.info(f"Порівняння з попередньою версією: {stats}")
+    return stats